@@ -48,6 +48,27 @@ def main():
         default=False,
         help='Verify dictionary files specified'
         )
+    parser.add_option(
+        '--force',
+        action='store_true',
+        default=False,
+        help='Verify files even if they were verified before '
+        'and have not changed since'
+        )
+    parser.add_option(
+        '-x', '--index',
+        action='store_true',
+        default=False,
+        help='Build lookup indexes for dictionary files specified'
+        )
+    parser.add_option(
+        '-f', '--fulltext',
+        action='store_true',
+        default=False,
+        help='Build full text search index for dictionary files specified '
+        '(takes long time for large dictionaries, may be interrupted '
+        'and resumed)'
+        )
     parser.add_option(
         '-d', '--debug',
         action='store_true',
@@ -82,12 +103,16 @@ def main():
 
 
     if options.verify:
-        verify(args)
+        verify(args, force=options.force)
 
     if options.metadata:
         metadata(args)
 
-    if options.identify or options.verify or options.metadata:
+    if options.index or options.fulltext:
+        index(args, lookup=options.index, fulltext=options.fulltext)
+
+    if (options.identify or options.verify or
+        options.metadata or options.index or options.fulltext):
         raise SystemExit
 
     import aarddict.qtui
@@ -112,8 +137,9 @@ def identify(file_names):
         print tmpl % ('Articles', volume.article_count)
 
 
-def verify(file_names):
+def verify(file_names, force=False):
     from .dictionary import Volume, VerifyError
+    from .verification import format_time
 
     ERASE_LINE = '\033[2K'
     BOLD='\033[1m'
@@ -123,16 +149,37 @@ def verify(file_names):
 
     for file_name in file_names:
         volume = Volume(file_name)
+        previous = None if force else volume.verification()
+        if previous:
+            valid, verified_time = previous
+            sys.stdout.write(file_name+' ')
+            if valid:
+                sys.stdout.write(BOLD+GREEN+'[OK]'+ENDC)
+            else:
+                sys.stdout.write(BOLD+RED+'[CORRUPTED]'+ENDC)
+            sys.stdout.write(' (verified on %s, use --force to verify again)\n'
+                             % format_time(verified_time))
+            sys.stdout.flush()
+            continue
         try:
-            for progress in volume.verify():
+            for progress in volume.verify(force=True):
                 sys.stdout.write(ERASE_LINE+'\r')
                 sys.stdout.write('Verifying %s: %.1f%%' % (file_name, 100*progress))
                 sys.stdout.flush()
-        except VerifyError:
+        except VerifyError, e:
             sys.stdout.write(ERASE_LINE+'\r')
             sys.stdout.write(file_name+' ')
             sys.stdout.write(BOLD+RED+'[CORRUPTED]'+ENDC)
             sys.stdout.write('\n')
+            if e.bad_range:
+                start, end = e.bad_range
+                damaged = volume.damaged_articles(start, end)
+                sys.stdout.write('  damaged data at bytes %d-%d, '
+                                 '%d article(s) affected\n'
+                                 % (start, end, len(damaged)))
+                for i in damaged[:10]:
+                    sys.stdout.write('    %s\n'
+                                     % volume.words[i].encode('utf8'))
             sys.stdout.flush()
         else:
             sys.stdout.write(ERASE_LINE+'\r')
@@ -142,6 +189,50 @@ def verify(file_names):
             sys.stdout.flush()
 
 
+def index(file_names, lookup=True, fulltext=False):
+    from .dictionary import Volume, Library, format_title
+
+    ERASE_LINE = '\033[2K'
+
+    for file_name in file_names:
+        volume = Volume(file_name)
+        builders = []
+        if lookup:
+            builders.append(('sort keys', volume.build_sort_key_index))
+            builders.append(('trigrams', volume.build_trigram_index))
+            builders.append(('reversed titles',
+                             volume.build_reversed_index))
+        if fulltext:
+            builders.append(('full text', volume.build_fulltext_index))
+        for name, build in builders:
+            for progress in build():
+                sys.stdout.write(ERASE_LINE+'\r')
+                sys.stdout.write('Indexing %s (%s): %.1f%%'
+                                 % (file_name, name, 100*progress))
+                sys.stdout.flush()
+        sys.stdout.write(ERASE_LINE+'\r')
+        sys.stdout.write('%s indexed\n' % file_name)
+        sys.stdout.flush()
+        volume.close()
+
+    if lookup:
+        library = Library()
+        for file_name in file_names:
+            library.add(file_name)
+        for uuid in library.uuids():
+            title = format_title(library.volumes(uuid)[0],
+                                 with_vol_num=False).encode('utf8')
+            for progress in library.build_redirect_table(uuid):
+                sys.stdout.write(ERASE_LINE+'\r')
+                sys.stdout.write('Resolving redirects in %s: %.1f%%'
+                                 % (title, 100*progress))
+                sys.stdout.flush()
+            sys.stdout.write(ERASE_LINE+'\r')
+            sys.stdout.write('%s redirects resolved\n' % title)
+            sys.stdout.flush()
+        library.close()
+
+
 def metadata(file_names):
     from .dictionary import Volume
     for file_name in file_names:
@@ -0,0 +1,150 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+from __future__ import with_statement
+
+from threading import Lock
+
+_PREV, _NEXT, _KEY, _VALUE, _SIZE = range(5)
+
+_missing = object()
+
+
+class LRUCache(object):
+    """
+    Thread-safe mapping that evicts least recently used items once
+    total size of items exceeds `max_size`. Size of each item is
+    computed with `sizeof`, by default every item has size 1.
+
+    >>> c = LRUCache(max_size=2)
+    >>> c['a'] = 1
+    >>> c['b'] = 2
+    >>> c['a']
+    1
+    >>> c['c'] = 3
+    >>> 'a' in c, 'b' in c, 'c' in c
+    (True, False, True)
+    >>> c.get('b', 'none')
+    'none'
+    >>> c.hits, c.misses, c.evictions
+    (1, 1, 1)
+    >>> c.hit_ratio
+    0.5
+
+    >>> c = LRUCache(max_size=5, sizeof=len)
+    >>> c[1] = 'abc'
+    >>> c[2] = 'de'
+    >>> c[3] = 'f'
+    >>> sorted(c.keys()), c.size
+    ([2, 3], 3)
+    >>> c[4] = 'too long'
+    >>> 4 in c
+    False
+
+    """
+
+    def __init__(self, max_size=1000, sizeof=None, name=''):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.name = name
+        self.lock = Lock()
+        self.map = {}
+        self.root = root = []
+        root[:] = [root, root, None, None, 0]
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.map)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return float(self.hits)/total if total else 0.0
+
+    def __contains__(self, key):
+        return key in self.map
+
+    def keys(self):
+        with self.lock:
+            return self.map.keys()
+
+    def get(self, key, default=None):
+        with self.lock:
+            link = self.map.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._move_to_front(link)
+            return link[_VALUE]
+
+    def __getitem__(self, key):
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        size = self.sizeof(value) if self.sizeof else 1
+        with self.lock:
+            link = self.map.pop(key, None)
+            if link is not None:
+                self._unlink(link)
+            if size > self.max_size:
+                return
+            root = self.root
+            last = root[_PREV]
+            link = [last, root, key, value, size]
+            last[_NEXT] = root[_PREV] = self.map[key] = link
+            self.size += size
+            while self.size > self.max_size:
+                oldest = root[_NEXT]
+                del self.map[oldest[_KEY]]
+                self._unlink(oldest)
+                self.evictions += 1
+
+    def __delitem__(self, key):
+        with self.lock:
+            self._unlink(self.map.pop(key))
+
+    def _unlink(self, link):
+        link_prev, link_next = link[_PREV], link[_NEXT]
+        link_prev[_NEXT] = link_next
+        link_next[_PREV] = link_prev
+        self.size -= link[_SIZE]
+
+    def _move_to_front(self, link):
+        link_prev, link_next = link[_PREV], link[_NEXT]
+        link_prev[_NEXT] = link_next
+        link_next[_PREV] = link_prev
+        root = self.root
+        last = root[_PREV]
+        last[_NEXT] = root[_PREV] = link
+        link[_PREV] = last
+        link[_NEXT] = root
+
+    def clear(self):
+        with self.lock:
+            self.map.clear()
+            root = self.root
+            root[:] = [root, root, None, None, 0]
+            self.size = 0
+
+    def __repr__(self):
+        return ('%s(%r, max_size=%r, size=%r)' %
+                (self.__class__.__name__, self.name,
+                 self.max_size, self.size))
@@ -0,0 +1,156 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Per-block checksums of volume data.
+
+Whole file sha1 can only be computed sequentially and doesn't tell
+where data is damaged. Block manifest holds sha1 of each fixed size
+block of the checksummed part of volume file, so blocks can be checked
+independently, in parallel, and first damaged block found is known.
+
+Manifest is written after volume passes full verification, so it
+describes good data.
+
+"""
+
+from hashlib import sha1
+
+from aarddict import sidecar
+from aarddict.pool import WorkerPool
+
+try:
+    from multiprocessing import cpu_count
+except ImportError:
+    cpu_count = None
+
+KIND = 'blks'
+
+block_size = 4*1024*1024
+
+INFO, DIGESTS = range(2)
+
+
+def default_workers():
+    if cpu_count:
+        try:
+            return cpu_count()
+        except NotImplementedError:
+            pass
+    return 2
+
+
+def block_ranges(start, end, size):
+    """
+    >>> block_ranges(10, 35, 10)
+    [(10, 20), (20, 30), (30, 35)]
+
+    """
+    return [(lo, min(lo + size, end)) for lo in xrange(start, end, size)]
+
+
+class BlockHasher(object):
+    """
+    Computes block digests from consecutive chunks of data starting at
+    file offset `start`.
+
+    >>> h = BlockHasher(0, 4)
+    >>> h.update('abcdef'); h.update('gh'); h.update('i')
+    >>> h.finish() == [sha1(s).digest() for s in ('abcd', 'efgh', 'i')]
+    True
+
+    """
+
+    def __init__(self, start, size=block_size):
+        self.start = self.pos = start
+        self.size = size
+        self.digests = []
+        self.current = sha1()
+        self.current_len = 0
+
+    def update(self, s):
+        while s:
+            n = self.size - self.current_len
+            head, s = s[:n], s[n:]
+            self.current.update(head)
+            self.current_len += len(head)
+            self.pos += len(head)
+            if self.current_len == self.size:
+                self.digests.append(self.current.digest())
+                self.current = sha1()
+                self.current_len = 0
+
+    def finish(self):
+        if self.current_len:
+            self.digests.append(self.current.digest())
+            self.current = sha1()
+            self.current_len = 0
+        return self.digests
+
+    def write(self, owner_id):
+        digests = self.finish()
+        writer = sidecar.SidecarWriter(owner_id, KIND)
+        try:
+            writer.add_records('>QQQ', [(self.start, self.pos, self.size)])
+            writer.add_strings(digests)
+        except:
+            writer.abort()
+            raise
+        else:
+            writer.close()
+
+
+def open_manifest(owner_id):
+    manifest_sidecar = sidecar.open_sidecar(owner_id, KIND)
+    return BlockManifest(manifest_sidecar) if manifest_sidecar else None
+
+
+class BlockManifest(object):
+
+    def __init__(self, manifest_sidecar):
+        self.sidecar = manifest_sidecar
+        self.start, self.end, self.size = manifest_sidecar[INFO][0]
+        self.digests = manifest_sidecar[DIGESTS]
+        self.ranges = block_ranges(self.start, self.end, self.size)
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def check(self, read_block, workers=None):
+        """
+        Check blocks with `workers` threads (number of CPUs by
+        default), yielding (block range, ok) in block order. Blocks
+        are read with `read_block(start, end)`, which must return
+        a string or buffer. Blocks not checked yet are skipped when
+        generator is closed.
+
+        """
+        def check_block(i):
+            lo, hi = self.ranges[i]
+            #hashlib releases GIL while hashing large buffers,
+            #so blocks are checked in parallel
+            return sha1(read_block(lo, hi)).digest() == self.digests[i]
+        pool = WorkerPool(workers or default_workers(), name='verify')
+        try:
+            results = pool.map(check_block, range(len(self.ranges)))
+            try:
+                for i, ok in enumerate(results):
+                    yield self.ranges[i], ok
+            finally:
+                results.close()
+        finally:
+            pool.shutdown()
+
+    def close(self):
+        self.sidecar.close()
@@ -16,7 +16,7 @@ import gc
 from operator import itemgetter
 from datetime import datetime
 
-import dictionary
+from aarddict.cache import LRUCache
 
 last_type_stats = {}
 
@@ -69,8 +69,9 @@ def rungc():
 def dump_cache_stats():
     print '====>\t', 'cache stats', datetime.strftime(datetime.now(), '%X')
     for obj in gc.get_objects():
-        if isinstance(obj, dictionary.CacheList):
-            ratio_str = '%.2f' % (float(obj.hit)/obj.miss) if obj.miss else ''
-            print '\t', obj.name, ('\thit/miss: %s\thit: %5d\tmiss: %5d\tsize: %3d' 
-                                   % (ratio_str, obj.hit, obj.miss, len(obj.cache)))
-    
+        if isinstance(obj, LRUCache):
+            ratio_str = '%.2f' % obj.hit_ratio if obj.hits + obj.misses else ''
+            print '\t', obj.name, ('\thit ratio: %s\thit: %5d\tmiss: %5d'
+                                   '\tevicted: %5d\tsize: %5d/%d'
+                                   % (ratio_str, obj.hits, obj.misses,
+                                      obj.evictions, obj.size, obj.max_size))
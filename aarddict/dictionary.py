@@ -18,49 +18,80 @@ import logging
 import zlib
 import bz2
 import os
+import sys
+import time
 import mmap
 
-from bisect import bisect_left
-from struct import calcsize, unpack
+from bisect import bisect_left, bisect_right
+from struct import calcsize, unpack, unpack_from
 from collections import defaultdict
+from itertools import islice
 from uuid import UUID
-from threading import local
+from threading import Lock
 
 import simplejson
 try:
     from icu import Locale, Collator
 except ImportError:
     from PyICU import Locale, Collator
+try:
+    from icu import ICU_VERSION
+except ImportError:
+    try:
+        from PyICU import ICU_VERSION
+    except ImportError:
+        ICU_VERSION = ''
+
+from aarddict import (sidecar, fuzzy, fulltext, redirects, verification,
+                      checksums, headercache, wildcard)
+from aarddict.cache import LRUCache
+from aarddict.pool import WorkerPool
+from aarddict.lazyjson import decode_article
 
 
 PRIMARY = Collator.PRIMARY
 SECONDARY = Collator.SECONDARY
 TERTIARY = Collator.TERTIARY
 
+strengths = (PRIMARY, SECONDARY, TERTIARY)
+
 from hashlib import sha1
 
-compression = (zlib.compress, bz2.compress)
+getsizeof = getattr(sys, 'getsizeof', len)
 
-decompression = (zlib.decompress, bz2.decompress)
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+compression = (zlib.compress, bz2.compress)
 
 max_redirect_levels = 5
 
+#total size in bytes of parsed articles kept by Library
+default_article_cache_size = 16*1024*1024
+
+word_cache = LRUCache(max_size=50000, name='words')
+sort_key_cache = LRUCache(max_size=50000, name='sort keys')
+
+_missing = object()
+
 
 def format_title(d, with_vol_num=True):
     parts = [d.title]
-    lang = d.metadata.get('lang')
-    if lang:
-        parts.append(u' (%s)' % lang)
-    else:
-        sitelang = d.metadata.get('sitelang')
-        if sitelang:
-            parts.append(u' (%s)' % sitelang)
+    if d.lang:
+        parts.append(u' (%s)' % d.lang)
+    elif d.sitelang:
+        parts.append(u' (%s)' % d.sitelang)
     if with_vol_num and d.total_volumes > 1:
         parts.append(u' Vol. %s' % d.volume)
     return u''.join(parts)
 
 
-def calcsha1(file_name, offset, chunksize=100000):
+def calcsha1(file_name, offset, chunksize=100000, blocks=None):
     with open(file_name, 'rb') as f:
         f.seek(offset)
         result = sha1()
@@ -68,19 +99,81 @@ def calcsha1(file_name, offset, chunksize=100000):
             s = f.read(chunksize)
             if not s: break
             result.update(s)
+            if blocks is not None:
+                blocks.update(s)
             yield (f.tell(), result)
 
 
-def decompress(s):
-    decompressed = s
-    for decomp in decompression:
-        try:
-            decompressed = decomp(s)
-        except:
-            pass
-        else:
-            break
-    return decompressed
+#codec name -> (function testing magic bytes, decompression function)
+decompressors = {'raw': (lambda s: True, str)}
+decompressor_order = []
+
+def register_decompressor(name, matches, decompress_func):
+    """
+    Make codec available for reading dictionaries. `matches` is given
+    first bytes of compressed data and returns True if they look like
+    data compressed with this codec.
+
+    """
+    if name not in decompressor_order:
+        decompressor_order.append(name)
+    decompressors[name] = (matches, decompress_func)
+
+def _is_zlib(s):
+    """
+    >>> _is_zlib(zlib.compress('abc'))
+    True
+    >>> _is_zlib(bz2.compress('abc'))
+    False
+    >>> _is_zlib('["abc", [], {}]')
+    False
+
+    """
+    if len(s) < 2:
+        return False
+    cmf, flg = ord(s[0]), ord(s[1])
+    return cmf & 0x0f == 8 and ((cmf << 8) | flg) % 31 == 0
+
+register_decompressor('zlib', _is_zlib, zlib.decompress)
+register_decompressor('bz2', lambda s: s[:3] == 'BZh', bz2.decompress)
+if lzma:
+    register_decompressor('xz', lambda s: s[:6] == '\xfd7zXZ\x00',
+                          lzma.decompress)
+    register_decompressor('lzma', lambda s: s[:3] == '\x5d\x00\x00',
+                          lzma.decompress)
+
+def detect_codec(s):
+    """
+    >>> detect_codec(bz2.compress('abc'))
+    'bz2'
+    >>> detect_codec(zlib.compress('abc'))
+    'zlib'
+    >>> detect_codec('["abc", [], {}]')
+    'raw'
+
+    """
+    for name in decompressor_order:
+        matches, _ = decompressors[name]
+        if matches(s):
+            return name
+    return 'raw'
+
+def decompress(s, codec=None):
+    """
+    Decompress `s` with `codec`, detected from magic bytes if not
+    specified. Data that doesn't look compressed is returned as is.
+
+    >>> decompress(bz2.compress('abc'))
+    'abc'
+    >>> decompress(zlib.compress('abc'), 'zlib')
+    'abc'
+    >>> decompress('abc')
+    'abc'
+
+    """
+    if codec is None:
+        codec = detect_codec(s)
+    return decompressors[codec][1](s)
 
 
 def _collators():
@@ -91,14 +184,68 @@ def _collators():
         return c
 
     return dict([(strength, create_collator(strength).getCollationKey)
-                 for strength in (PRIMARY, SECONDARY, TERTIARY)])
+                 for strength in strengths])
 
 _collators = _collators()
 
 def collation_key(word, strength):
     return _collators[strength](word)
 
-def cmp_words(word1, word2, strength):
+
+class KeyContext(object):
+    """
+    Collation keys of query words computed during one query, so that
+    lookups in all volumes and at all strengths compute each
+    (word, strength) key once. Counts keys computed and reused.
+
+    Every word comparison asks for query key, so this is also where
+    lookup checks threading.Event `cancel` and raises LookupCancelled
+    once it is set.
+
+    """
+
+    def __init__(self, cancel=None):
+        self.keys = {}
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.cancel = cancel
+
+    def check_cancelled(self):
+        if self.cancel is not None and self.cancel.isSet():
+            raise LookupCancelled
+
+    def _get(self, k, compute):
+        self.check_cancelled()
+        with self.lock:
+            if k in self.keys:
+                self.hits += 1
+                return self.keys[k]
+        result = compute()
+        with self.lock:
+            self.misses += 1
+            self.keys[k] = result
+        return result
+
+    def key(self, word, strength):
+        return self._get((word, strength),
+                         lambda: collation_key(word, strength))
+
+    def byte_key(self, word, strength):
+        return self._get((word, strength, 'bytes'),
+                         lambda: self.key(word, strength).getByteArray())
+
+    def __repr__(self):
+        return '%s(keys=%d, hits=%d, misses=%d)' % (
+            self.__class__.__name__, len(self.keys), self.hits, self.misses)
+
+
+def _query_key(word, strength, keys):
+    if keys is None:
+        return collation_key(word, strength)
+    return keys.key(word, strength)
+
+def cmp_words(word1, word2, strength, keys=None):
     """
     >>> cmp_words(u'a', u'b', PRIMARY)
     -1
@@ -120,12 +267,12 @@ def cmp_words(word1, word2, strength):
 
     """
     k1 = collation_key(word1[:len(word2)], strength)
-    k2 = collation_key(word2, strength)
+    k2 = _query_key(word2, strength, keys)
     return k1.compareTo(k2)
 
 cmp_word_start = cmp_words
 
-def cmp_word_exact(word1, word2, strength):
+def cmp_word_exact(word1, word2, strength, keys=None):
     """
     >>> cmp_words_exact(u'a', u'b', PRIMARY)
     -1
@@ -168,9 +315,16 @@ def cmp_word_exact(word1, word2, strength):
 
     """
     k1 = collation_key(word1, strength)
-    k2 = collation_key(word2, strength)
+    k2 = _query_key(word2, strength, keys)
     return k1.compareTo(k2)
 
+#lookup_range modes
+EXACT = 'exact'
+PREFIX = 'prefix'
+
+lookup_modes = {cmp_word_exact: EXACT,
+                cmp_word_start: PREFIX}
+
 
 def split_word(word):
     """
@@ -198,28 +352,28 @@ def split_word(word):
     return lookupword, section
 
 
-class CacheList(local):
+class CacheList(object):
+    """
+    List view that keeps items of `alist` in a `cache` shared by all
+    threads, under `(cache_id, i)` keys.
 
-    def __init__(self, alist, name=''):
-        super(CacheList, self).__init__(self)
+    """
+
+    def __init__(self, alist, cache, cache_id):
         self.alist = alist
-        self.cache = {}
-        self.hit = 0
-        self.miss = 0
-        self.name = name
+        self.cache = cache
+        self.cache_id = cache_id
 
     def __len__(self):
         return len(self.alist)
 
     def __getitem__(self, i):
-        c = self.cache
-        if i not in c:
-            c[i] = r = self.alist[i]
-            # self.miss += 1
-            return r
-        else:
-            # self.hit += 1
-            return c[i]
+        key = (self.cache_id, i)
+        value = self.cache.get(key, _missing)
+        if value is _missing:
+            value = self.alist[i]
+            self.cache[key] = value
+        return value
 
 
 class WordList(object):
@@ -316,6 +470,91 @@ class Entry(object):
                  self.index, self.title, self.section, self.redirect_from))
 
 
+class LookupRange(object):
+    """
+    Span [lo, hi) of volume index matching a lookup word. Entries
+    are created on demand, without further word comparisons.
+
+    """
+
+    def __init__(self, volume, lo, hi):
+        self.volume = volume
+        self.lo = lo
+        self.hi = hi
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def __iter__(self):
+        return self.entries()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            return [self.volume.entry(self.lo + j)
+                    for j in xrange(start, stop, step)]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.volume.entry(self.lo + i)
+
+    def entries(self, start=0, stop=None):
+        """Generate entries from start to stop relative to range start"""
+        end = self.hi if stop is None else min(self.lo + stop, self.hi)
+        for index in xrange(self.lo + start, end):
+            yield self.volume.entry(index)
+
+    def __repr__(self):
+        return '%s(%r, %d, %d)' % (self.__class__.__name__,
+                                   self.volume, self.lo, self.hi)
+
+
+class LookupSession(object):
+    """
+    PRIMARY strength prefix ranges found for recent words, by volume.
+
+    Words matching `word` at any strength, exactly or as a prefix,
+    start with it at PRIMARY strength, and such words form one run
+    of volume index. So each lookup is bounded by PRIMARY prefix range
+    of its word, which in turn is searched for within range recorded
+    for previous word if it is a prefix of this one: when user types
+    one more character only that range is searched. After a deletion
+    or an edit in the middle lookup word doesn't start with recorded
+    one and whole index is searched again.
+
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.ranges = {}
+
+    def bounds(self, vol, word, keys=None):
+        """
+        Return (lo, hi) part of volume index containing all words
+        matching `word`.
+
+        """
+        with self.lock:
+            recorded = self.ranges.get(vol.volume_id)
+        previous = None
+        if recorded is not None:
+            prefix, lo, hi = recorded
+            if word == prefix:
+                return lo, hi
+            if word.startswith(prefix):
+                previous = lo, hi
+        prefix_range = vol.lookup_range(word, PRIMARY, PREFIX, keys, previous)
+        with self.lock:
+            self.ranges[vol.volume_id] = (word,
+                                          prefix_range.lo, prefix_range.hi)
+        return prefix_range.lo, prefix_range.hi
+
+    def clear(self):
+        with self.lock:
+            self.ranges.clear()
+
+
 class Article(object):
 
     def __init__(self, entry, text):
@@ -344,6 +583,21 @@ class Redirect(object):
         return ('%s(%r, %r)' % (self.__class__.__name__, self.entry, self.target))
 
 
+def make_read_result(entry, text, redirect):
+    if redirect and entry.section:
+        redirect = u'#'.join((redirect, entry.section))
+
+    if redirect:
+        return Redirect(entry, redirect)
+    else:
+        return Article(entry, text)
+
+
+def content_size(content):
+    text, redirect = content
+    return getsizeof(text) + getsizeof(redirect)
+
+
 HEADER_SPEC = (('signature',                '>4s'), # string 'aard'
                ('sha1sum',                  '>40s'), #sha1 sum of dictionary file content following signature and sha1 bytes
                ('version',                  '>H'), #format version, a number, current value 1
@@ -365,17 +619,43 @@ def spec_len(spec):
     return result
 
 
+def read_volume_id(file_name):
+    """
+    Read volume id (sha1sum) from volume header without opening volume.
+
+    """
+    cached = headercache.get(file_name)
+    if cached:
+        header, _, _ = cached
+        return header['sha1sum']
+    id_spec = HEADER_SPEC[:2]
+    with open(file_name, 'rb') as f:
+        s = f.read(spec_len(id_spec))
+    if len(s) < spec_len(id_spec) or s[:4] != 'aard':
+        raise DictFormatError(file_name,
+                              'Not a recognized aarddict dictionary file')
+    return s[4:]
+
+
 class Volume(object):
 
     def __init__(self, file_name):
 
         self.file_name = file_name
 
-        with open(self.file_name, 'rb') as f:
-            header = self._read_header(f)
+        cached = headercache.get(file_name)
+        if cached:
+            header, meta, self._article_url = cached
             self._check_format(header)
-            self.metadata = meta = self._read_meta(f, header['meta_length'])
+            self._metadata = None
+        else:
+            with open(self.file_name, 'rb') as f:
+                header = self._read_header(f)
+                self._check_format(header)
+                self._metadata = meta = self._read_meta(f, header['meta_length'])
+            self._article_url = None
 
+        self.meta_length = header['meta_length']
         self.index_count = header['index_count']
         self.volume_id = self.sha1sum = header['sha1sum']
         self.uuid = UUID(bytes=header['uuid'])
@@ -386,6 +666,9 @@ class Volume(object):
         index1_offset = spec_len(HEADER_SPEC) + header['meta_length']
         index1_item_format = header['index1_item_format']
         index2_offset = index1_offset + self.index_count*calcsize(index1_item_format)
+        self.index1_offset = index1_offset
+        self.index1_item_format = index1_item_format
+        self.article_offset = article_offset
         key_length_format = header['key_length_format']
         article_length_format = header['article_length_format']
 
@@ -412,11 +695,23 @@ class Volume(object):
         self.license = meta.get('license', u'')
         self.source = meta.get('source', u'')
         self.language_links = sorted(meta.get('language_links', []))
+        self.lang = meta.get('lang')
+        self.sitelang = meta.get('sitelang')
 
-        f = open(self.file_name, 'rb')
-        self.fmap = mmap.mmap(f.fileno(),
-                              article_offset,
-                              access=mmap.ACCESS_READ)
+        self.f = f = open(self.file_name, 'rb')
+        try:
+            #map articles too so that they are read without extra copies
+            self.fmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            articles_mapped = True
+        except (EnvironmentError, OverflowError):
+            #file may be too big for address space, e.g. on 32-bit systems
+            logging.debug('Could not map all of %s, will read articles from file',
+                          self.file_name, exc_info=1)
+            self.fmap = mmap.mmap(f.fileno(),
+                                  article_offset,
+                                  access=mmap.ACCESS_READ)
+            articles_mapped = False
+        f_lock = Lock()
 
         ii_structsize = calcsize(index1_item_format)
         def read_index_item(itemno):
@@ -432,18 +727,34 @@ class Volume(object):
             return self.fmap[start:start+strlen]
 
         alen_structsize = calcsize(article_length_format)
-        def read_article(pos):
-            with open(self.file_name, 'rb') as f:
-                f.seek(article_offset + pos)
-                s = f.read(alen_structsize)
-                strlen = unpack(article_length_format, s)[0]
-                compressed_article = f.read(strlen)
-                return decompress(compressed_article)
+        if articles_mapped:
+            def read_article(pos):
+                start = article_offset + pos
+                strlen = unpack_from(article_length_format, self.fmap, start)[0]
+                start += alen_structsize
+                return self._decompress(buffer(self.fmap, start, strlen))
+            def read_span(pos, length):
+                return buffer(self.fmap, article_offset + pos, length)
+        else:
+            def read_article(pos):
+                with f_lock:
+                    f.seek(article_offset + pos)
+                    s = f.read(alen_structsize)
+                    strlen = unpack(article_length_format, s)[0]
+                    compressed_article = f.read(strlen)
+                return self._decompress(compressed_article)
+            def read_span(pos, length):
+                with f_lock:
+                    f.seek(article_offset + pos)
+                    return f.read(length)
+        self._read_index_item = read_index_item
+        self._read_span = read_span
+        self.article_length_format = article_length_format
 
         self.words = CacheList(WordList(self.index_count,
                                         read_index_item,
                                         read_key),
-                               name='%s (w)' % format_title(self))
+                               word_cache, self.volume_id)
 
         self.articles = ArticleList(self.index_count,
                                     read_index_item,
@@ -451,7 +762,26 @@ class Volume(object):
                                     read_article)
 
         self._interwiki_map = None
-        self._article_url = None
+        self._index_array = None
+
+        self.sort_keys = sidecar.open_sidecar(self.volume_id, 'ckey',
+                                              ICU_VERSION)
+        self.trigram_index = fuzzy.open_index(self.volume_id)
+        self.fulltext_index = fulltext.open_index(self.volume_id)
+        self.reversed_index = wildcard.open_index(self.volume_id)
+
+        if not cached:
+            headercache.put(file_name, header, headercache.summary(meta),
+                            self.article_url)
+
+    def _get_metadata(self):
+        if self._metadata is None:
+            with open(self.file_name, 'rb') as f:
+                f.seek(spec_len(HEADER_SPEC))
+                self._metadata = self._read_meta(f, self.meta_length)
+        return self._metadata
+
+    metadata = property(_get_metadata)
 
     def _read_header(self, f):
         header = {}
@@ -480,6 +810,12 @@ class Volume(object):
         raw_meta = f.read(meta_length)
         return simplejson.loads(decompress(raw_meta))
 
+    def _decompress(self, s):
+        #codec may differ from article to article: compiler stores
+        #article as is when compression doesn't make it smaller,
+        #so codec is detected from magic bytes every time
+        return decompress(s)
+
     def __len__(self):
         return self.index_count
 
@@ -506,53 +842,325 @@ class Volume(object):
     def __hash__(self):
         return self.volume_id.__hash__()
 
-    def lookup(self, word, strength=PRIMARY, cmp_func=cmp_word_start):
-        if not word:
-            raise StopIteration
-        index = bisect_left(CollationKeyList(self.words, strength),
-                            collation_key(word, strength).getByteArray())
+    def index_array(self):
+        """
+        NumPy structured array view of index1 table (see
+        `aarddict.indexarray`), raises ImportError if NumPy is not
+        available.
+
+        """
+        if self._index_array is None:
+            from aarddict.indexarray import IndexArray
+            self._index_array = IndexArray(self.fmap, self.index1_offset,
+                                           self.index_count,
+                                           self.index1_item_format)
+        return self._index_array
+
+    def sort_key_list(self, strength):
+        """
+        Collation keys (byte arrays) of all words for given strength,
+        read from sort key index if it was built for this volume.
+
+        """
+        if self.sort_keys:
+            return self.sort_keys[strengths.index(strength)]
+        return CacheList(CollationKeyList(self.words, strength),
+                         sort_key_cache, (self.volume_id, strength))
+
+    def build_sort_key_index(self):
+        """
+        Write sort key index for this volume, yielding progress
+        (a float between 0 and 1) as words are processed.
+
+        """
+        writer = sidecar.SidecarWriter(self.volume_id, 'ckey', ICU_VERSION)
+        total = float(len(strengths)*len(self)) or 1.0
+        progress = [0]
+        def keys(strength):
+            key_func = _collators[strength]
+            #bypass word cache, full pass would only evict everything
+            for word in self.words.alist:
+                yield key_func(word).getByteArray()
+                progress[0] += 1
         try:
-            while True:
-                matched_word = self.words[index]
-                cmp_result = cmp_func(matched_word, word, strength)
-                if cmp_result == 0:
-                    #sometimes words in index include #fragment
-                    _, section = split_word(matched_word)
-                    #leave matched word exactly as is, but set section
-                    yield Entry(self.volume_id, index,
-                                matched_word, section=section)
-                    index += 1
-                else:
-                    break
-        except IndexError:
+            for strength in strengths:
+                writer.add_strings(keys(strength))
+                yield progress[0]/total
+        except:
+            writer.abort()
+            raise
+        else:
+            writer.close()
+        if self.sort_keys:
+            self.sort_keys.close()
+        self.sort_keys = sidecar.open_sidecar(self.volume_id, 'ckey',
+                                              ICU_VERSION)
+
+    def build_trigram_index(self):
+        """
+        Write trigram index used for approximate lookup, yielding
+        progress.
+
+        """
+        words = (split_word(word)[0] for word in self.words.alist)
+        for progress in fuzzy.build_index(self.volume_id, words, len(self)):
+            yield progress
+        if self.trigram_index:
+            self.trigram_index.close()
+        self.trigram_index = fuzzy.open_index(self.volume_id)
+
+    def build_reversed_index(self):
+        """
+        Write reversed title index used for wildcard patterns
+        starting with a wildcard, yielding progress.
+
+        """
+        words = (split_word(word)[0] for word in self.words.alist)
+        for progress in wildcard.build_index(self.volume_id, words,
+                                             len(self)):
+            yield progress
+        if self.reversed_index:
+            self.reversed_index.close()
+        self.reversed_index = wildcard.open_index(self.volume_id)
+
+    def build_fulltext_index(self, processes=None):
+        """
+        Write full text index for article bodies, yielding progress.
+
+        """
+        for progress in fulltext.build_index(self, processes):
+            yield progress
+        if self.fulltext_index:
+            self.fulltext_index.close()
+        self.fulltext_index = fulltext.open_index(self.volume_id)
+
+    def search(self, query, max_results=50):
+        """
+        Full text search, return list of (matched term count, score,
+        entry) tuples, best first. Volumes without full text index
+        find nothing.
+
+        """
+        if not self.fulltext_index:
+            return []
+        result = []
+        for matched, score, index in self.fulltext_index.search(query,
+                                                                max_results):
+            title = self.words[index]
+            _, section = split_word(title)
+            result.append((matched, score, Entry(self.volume_id, index,
+                                                 title, section=section)))
+        return result
+
+    def suggest(self, word, max_results=10, deadline=None):
+        """
+        Find entries with titles similar to word, return list of
+        (edit distance, entry) tuples. Volumes without trigram index
+        have no suggestions.
+
+        """
+        if not self.trigram_index:
+            return []
+        def get_word(i):
+            return split_word(self.words[i])[0]
+        result = []
+        for distance, index in self.trigram_index.search(word, get_word,
+                                                         max_results,
+                                                         deadline=deadline):
+            title = self.words[index]
+            _, section = split_word(title)
+            result.append((distance, Entry(self.volume_id, index,
+                                           title, section=section)))
+        return result
+
+    def match(self, pattern):
+        """
+        Find entries with titles matching wildcard `pattern` (see
+        `aarddict.wildcard`), yielding list of entries found in each
+        batch of index items checked. Lists may be empty, so that
+        caller can stop between batches.
+
+        Only index range starting with literal prefix of the pattern
+        or, if smaller, range of reversed title index ending with
+        literal suffix is checked.
+
+        """
+        word, _ = split_word(pattern)
+        matches = wildcard.compile_pattern(word)
+        prefix = wildcard.literal_prefix(word)
+        suffix = wildcard.literal_suffix(word)
+        count, indexes = len(self), xrange(len(self))
+        if prefix:
+            prefix_range = self.lookup_range(prefix, PRIMARY, PREFIX)
+            count = len(prefix_range)
+            indexes = xrange(prefix_range.lo, prefix_range.hi)
+        if suffix and self.reversed_index:
+            lo, hi = self.reversed_index.suffix_range(suffix)
+            if hi - lo < count:
+                indexes = (self.reversed_index.index(i)
+                           for i in xrange(lo, hi))
+        #read words around the shared cache, scan may touch
+        #millions of them
+        words = self.words.alist
+        batch = []
+        checked = 0
+        for index in indexes:
+            if matches(split_word(words[index])[0]):
+                batch.append(self.entry(index))
+            checked += 1
+            if checked == wildcard.batch_size:
+                yield batch
+                batch = []
+                checked = 0
+        yield batch
+
+    def entry(self, index):
+        word = self.words[index]
+        #sometimes words in index include #fragment
+        _, section = split_word(word)
+        #leave word exactly as is, but set section
+        return Entry(self.volume_id, index, word, section=section)
+
+    def lookup_range(self, word, strength=PRIMARY, mode=PREFIX, keys=None,
+                     bounds=None):
+        """
+        Return LookupRange of words equal to `word` (mode EXACT) or
+        starting with it (mode PREFIX) at collation `strength`. Query
+        keys are taken from KeyContext `keys` if given. Only (lo, hi)
+        part of index is searched if `bounds` are given.
+
+        Exact matches have the same sort key, so both bounds are
+        found by bisecting sort keys. Words starting with `word`
+        follow lower bound, upper bound is found by galloping and
+        then bisecting over prefix comparison. This needs them to form
+        one run, which is only the case at PRIMARY strength: at
+        SECONDARY and TERTIARY strengths sort keys are ordered by
+        primary weights first, so a prefix match such as `abd` for
+        `ab` may follow a word that is not a match such as `Abc`.
+
+        """
+        if not word:
+            return LookupRange(self, 0, 0)
+        if keys is None:
+            keys = KeyContext()
+        keys.check_cancelled()
+        sort_keys = self.sort_key_list(strength)
+        lo, count = bounds or (0, len(sort_keys))
+        query_key = keys.byte_key(word, strength)
+        lo = bisect_left(sort_keys, query_key, lo, count)
+        if mode == EXACT:
+            return LookupRange(self, lo,
+                               bisect_right(sort_keys, query_key, lo, count))
+        if mode != PREFIX:
+            raise ValueError('Unknown lookup mode %r' % mode)
+        if strength != PRIMARY:
+            raise ValueError('Prefix range lookup needs PRIMARY strength')
+
+        def matches(i):
+            return cmp_word_start(self.words[i], word, strength, keys) == 0
+
+        if lo >= count or not matches(lo):
+            return LookupRange(self, lo, lo)
+        #matches(lo + step/2) is known to be true
+        step = 1
+        while lo + step < count and matches(lo + step):
+            step *= 2
+        left, right = lo + step//2 + 1, min(lo + step, count)
+        while left < right:
+            mid = (left + right)//2
+            if matches(mid):
+                left = mid + 1
+            else:
+                right = mid
+        return LookupRange(self, lo, left)
+
+    def lookup(self, word, strength=PRIMARY, cmp_func=cmp_word_start,
+               keys=None, bounds=None):
+        if not word:
             raise StopIteration
+        if keys is None:
+            keys = KeyContext()
+        mode = lookup_modes.get(cmp_func)
+        if mode == EXACT or (mode == PREFIX and strength == PRIMARY):
+            for entry in self.lookup_range(word, strength, mode, keys,
+                                           bounds):
+                yield entry
+            return
+        sort_keys = self.sort_key_list(strength)
+        lo, hi = bounds or (0, len(sort_keys))
+        index = bisect_left(sort_keys, keys.byte_key(word, strength), lo, hi)
+        while index < hi:
+            keys.check_cancelled()
+            matched_word = self.words[index]
+            cmp_result = cmp_func(matched_word, word, strength, keys)
+            if cmp_result == 0:
+                #sometimes words in index include #fragment
+                _, section = split_word(matched_word)
+                #leave matched word exactly as is, but set section
+                yield Entry(self.volume_id, index,
+                            matched_word, section=section)
+                index += 1
+            else:
+                break
 
     def read(self, entry):
         if entry.volume_id != self.volume_id:
             raise ValueError("Entry is not from this volume")
-
-        serialized_article = self.articles[entry.index]
-
+        return make_read_result(entry, *self.read_content(entry.index))
+
+    def article_ptr(self, index):
+        """Position of article data for index item"""
+        return self._read_index_item(index)[-1]
+
+    def read_compressed(self, ptrs, window=1024*1024):
+        """
+        Read compressed data of articles at positions `ptrs` (sorted),
+        yielding (ptr, data). Articles within `window` bytes are
+        read together with one read.
+
+        """
+        length_format = self.article_length_format
+        length_size = calcsize(length_format)
+        span_start, span = 0, ''
+        for ptr in ptrs:
+            if not span_start <= ptr <= span_start + len(span) - length_size:
+                span_start, span = ptr, self._read_span(ptr, window)
+            pos = ptr - span_start
+            strlen = unpack_from(length_format, span, pos)[0]
+            pos += length_size
+            if pos + strlen > len(span):
+                #article doesn't fit in window
+                span_start = ptr
+                span = self._read_span(ptr, length_size + strlen)
+                pos = length_size
+            yield ptr, buffer(span, pos, strlen)
+
+    def decode_content(self, compressed_article):
+        """
+        Return (text, redirect) tuple for compressed article data.
+
+        """
+        return self.parse_content(self._decompress(compressed_article))
+
+    def read_content(self, index):
+        """
+        Return (text, redirect) tuple for article at index, redirect
+        is empty for regular articles.
+
+        """
+        return self.parse_content(self.articles[index])
+
+    def parse_content(self, serialized_article):
         try:
-            articletuple = simplejson.loads(serialized_article)
-            if len(articletuple) == 3:
-                text, _, meta = articletuple
-            else:
-                text, _ = articletuple
-                meta = {}
+            #tags are not used, don't spend time decoding them
+            text, meta = decode_article(serialized_article)
         except:
             logging.exception('was trying to load article from string:\n%r',
                               serialized_article[:20])
             raise
         else:
             redirect = meta.get(u'r', meta.get('redirect', u''))
-            if redirect and entry.section:
-                redirect = u'#'.join((redirect, entry.section))
-
-            if redirect:
-                return Redirect(entry, redirect)
-            else:
-                return Article(entry, text)
+            return text, redirect
 
     def _get_interwiki_map(self):
         if self._interwiki_map is None:
@@ -588,18 +1196,119 @@ class Volume(object):
 
     article_url = property(_get_article_url)
 
-    def verify(self):
+    def verification(self):
+        """
+        Return (valid, verification time) of last verification if
+        volume file hasn't changed since, None otherwise.
+
+        """
+        return verification.get(self.file_name, self.sha1sum)
+
+    def verify(self, force=False, workers=None):
+        """
+        Check volume data, yielding progress. Raises VerifyError if
+        data is damaged. Volume is checked block by block with
+        `workers` threads when block checksums were saved by previous
+        full verification, otherwise sha1sum of the whole file is
+        computed.
+
+        """
+        if not force:
+            previous = self.verification()
+            if previous:
+                valid, _ = previous
+                if not valid:
+                    raise VerifyError(self.file_name)
+                yield 1.0
+                return
         st_size = os.stat(self.file_name).st_size
+        manifest = checksums.open_manifest(self.volume_id)
+        if manifest and manifest.end == st_size:
+            try:
+                for progress in self._verify_blocks(manifest, workers):
+                    yield progress
+            finally:
+                manifest.close()
+            return
+        if manifest:
+            manifest.close()
         offset = spec_len(HEADER_SPEC[:2])
         size = float(st_size - offset)
         result = None
-        for pos, result in calcsha1(self.file_name, offset):
+        blocks = checksums.BlockHasher(offset)
+        for pos, result in calcsha1(self.file_name, offset, blocks=blocks):
             yield pos/size
-        if not result or result.hexdigest() != self.sha1sum:
-            raise VerifyError()
+        valid = bool(result) and result.hexdigest() == self.sha1sum
+        verification.put(self.file_name, self.sha1sum, valid)
+        if not valid:
+            raise VerifyError(self.file_name)
+        try:
+            blocks.write(self.volume_id)
+        except EnvironmentError:
+            logging.warning('Could not save block checksums for %s',
+                            self.file_name, exc_info=1)
+
+    def _verify_blocks(self, manifest, workers):
+        if len(self.fmap) >= manifest.end:
+            def read_block(start, end):
+                return buffer(self.fmap, start, end - start)
+        else:
+            def read_block(start, end):
+                with open(self.file_name, 'rb') as f:
+                    f.seek(start)
+                    return f.read(end - start)
+        total = float(len(manifest) or 1)
+        for i, (block, ok) in enumerate(manifest.check(read_block, workers)):
+            if not ok:
+                verification.put(self.file_name, self.sha1sum, False)
+                raise VerifyError(self.file_name, block)
+            yield (i + 1)/total
+        verification.put(self.file_name, self.sha1sum, True)
+
+    def damaged_articles(self, start, end):
+        """
+        Index numbers of articles with data stored in file range
+        [start, end), e.g. in a block that failed verification.
+
+        """
+        lo = max(start - self.article_offset, 0)
+        hi = end - self.article_offset
+        if hi <= 0:
+            return []
+        try:
+            index_array = self.index_array()
+        except ImportError:
+            index_array = None
+        if index_array is not None:
+            ptrs = index_array.sorted_article_ptrs()
+            #article stored before lo may continue into the range
+            i = ptrs.searchsorted(lo, side='right')
+            first_ptr = ptrs[i - 1] if i else lo
+            return sorted(index_array.articles_in_range(first_ptr,
+                                                        hi).tolist())
+        item_size = calcsize(self.index1_item_format)
+        ptrs = [unpack_from(self.index1_item_format, self.fmap,
+                            self.index1_offset + i*item_size)[-1]
+                for i in xrange(self.index_count)]
+        first_ptr = max([ptr for ptr in ptrs if ptr <= lo] or [lo])
+        return [i for i, ptr in enumerate(ptrs) if first_ptr <= ptr < hi]
 
     def close(self):
+        self._index_array = None
+        if self.sort_keys:
+            self.sort_keys.close()
+            self.sort_keys = None
+        if self.trigram_index:
+            self.trigram_index.close()
+            self.trigram_index = None
+        if self.fulltext_index:
+            self.fulltext_index.close()
+            self.fulltext_index = None
+        if self.reversed_index:
+            self.reversed_index.close()
+            self.reversed_index = None
         self.fmap.close()
+        self.f.close()
 
 
 class DictFormatError(Exception):
@@ -613,7 +1322,13 @@ class DictFormatError(Exception):
         return '%s: %s' % (self.file_name, self.reason)
 
 
-class VerifyError(Exception): pass
+class VerifyError(Exception):
+
+    def __init__(self, file_name=None, bad_range=None):
+        Exception.__init__(self, file_name, bad_range)
+        self.file_name = file_name
+        #(start, end) file offsets of first damaged block, if known
+        self.bad_range = bad_range
 
 
 class ArticleNotFound(Exception):
@@ -630,6 +1345,43 @@ class TooManyRedirects(Exception):
         self.entry = entry
 
 
+class LookupCancelled(Exception): pass
+
+
+class VolumeRegistry(object):
+    """
+    Snapshot of volume indexes by volume id, dictionary uuid,
+    language and article url.
+
+    """
+
+    def __init__(self, volumes):
+        self.by_id = {}
+        self.by_uuid = defaultdict(list)
+        self.by_lang = defaultdict(list)
+        self.uuid_by_article_url = {}
+        for vol in volumes:
+            self.by_id.setdefault(vol.volume_id, vol)
+            self.by_uuid[vol.uuid].append(vol)
+            self.by_lang[vol.index_language].append(vol)
+            article_url = vol.article_url
+            if article_url:
+                self.uuid_by_article_url.setdefault(article_url, vol.uuid)
+        for vols in self.by_uuid.itervalues():
+            vols.sort(key=lambda d: d.volume)
+
+
+def _resets_registry(method):
+    def f(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._registry = None
+        self.generation += 1
+        return result
+    f.__name__ = method.__name__
+    f.__doc__ = method.__doc__
+    return f
+
+
 class Library(list):
 
     best_match_comparisons = ((cmp_word_exact, TERTIARY),
@@ -643,47 +1395,178 @@ class Library(list):
                         (cmp_word_exact, SECONDARY),
                         (cmp_word_exact, PRIMARY))
 
+    def __init__(self, *args, **kwargs):
+        article_cache_size = kwargs.pop('article_cache_size',
+                                        default_article_cache_size)
+        lookup_workers = kwargs.pop('lookup_workers', 0)
+        read_workers = kwargs.pop('read_workers', 2)
+        list.__init__(self, *args, **kwargs)
+        self._registry = None
+        #changes whenever volumes are added, removed or reordered
+        self.generation = 0
+        #when set, volumes are looked up concurrently. Key computation
+        #holds GIL, so this only helps with several CPUs and
+        #is off by default
+        self.lookup_pool = (WorkerPool(lookup_workers, name='lookup')
+                            if lookup_workers > 1 else None)
+        #decompresses articles for read_many
+        self.read_pool = WorkerPool(read_workers, name='read')
+        self.article_cache = LRUCache(max_size=article_cache_size,
+                                      sizeof=content_size,
+                                      name='articles')
+        #(volume_id, index) -> (volume_id, index, section) of
+        #redirect targets resolved so far
+        self.redirect_cache = LRUCache(max_size=10000, name='redirects')
+        self.redirect_tables = {}
+        #narrows best_match lookups while user types a word
+        self.lookup_session = LookupSession()
+
+    append = _resets_registry(list.append)
+    extend = _resets_registry(list.extend)
+    insert = _resets_registry(list.insert)
+    remove = _resets_registry(list.remove)
+    pop = _resets_registry(list.pop)
+    sort = _resets_registry(list.sort)
+    reverse = _resets_registry(list.reverse)
+    __setitem__ = _resets_registry(list.__setitem__)
+    __delitem__ = _resets_registry(list.__delitem__)
+    __setslice__ = _resets_registry(list.__setslice__)
+    __delslice__ = _resets_registry(list.__delslice__)
+    __iadd__ = _resets_registry(list.__iadd__)
+
+    @property
+    def registry(self):
+        registry = self._registry
+        if registry is None:
+            registry = self._registry = VolumeRegistry(self)
+        return registry
+
     def add(self, filename):
-        d = Volume(filename)
-        try:
-            index = self.index(d)
-        except ValueError:
+        existing = self.volume(read_volume_id(filename))
+        if existing is not None:
+            return existing
+        return self.add_volume(Volume(filename))
+
+    def add_volume(self, d):
+        existing = self.volume(d.volume_id)
+        if existing is None:
             self.append(d)
             return d
         else:
             d.close()
-            return self[index]
+            return existing
+
+    def close(self):
+        """Stop worker threads and close all volumes"""
+        if self.lookup_pool:
+            self.lookup_pool.shutdown()
+        self.read_pool.shutdown()
+        for table in self.redirect_tables.itervalues():
+            if table:
+                table.close()
+        self.redirect_tables.clear()
+        for volume in self:
+            volume.close()
 
     def langs(self):
-        return set((d.index_language for d in self))
+        return set(self.registry.by_lang)
 
     def uuids(self):
-        return set((d.uuid for d in self))
+        return set(self.registry.by_uuid)
 
     def volumes(self, uuid):
-        return sorted((d for d in self if d.uuid == uuid),
-                      key=lambda d: d.volume)
+        return list(self.registry.by_uuid.get(uuid, ()))
 
     def volume(self, volume_id):
-        r = [v for v in self if v.volume_id == volume_id]
-        return r[0] if r else None
+        return self.registry.by_id.get(volume_id)
 
     def dict_by_article_url(self, article_url):
         if article_url:
-            for vol in self:
-                if vol.article_url == article_url:
-                    return vol.uuid
+            return self.registry.uuid_by_article_url.get(article_url)
         return None
 
-    def best_match(self, word, max_from_vol=50):
+    def best_match(self, word, max_from_vol=50, cancel=None):
+        """
+        Find entries for `word` in all volumes, best matches
+        first. Lookup raises LookupCancelled when threading.Event
+        `cancel` is set.
+
+        """
         return self._lookup(word, self,
-                            self.best_match_comparisons, max_from_vol)
+                            self.best_match_comparisons, max_from_vol,
+                            cancel, self.lookup_session)
+
+    def match(self, pattern, max_results=100):
+        """
+        Find entries with titles matching wildcard pattern in all
+        volumes. Yields lists of entries as they are found, lists
+        may be empty so that caller can stop between batches.
+
+        """
+        _, section = split_word(pattern)
+        seen = set()
+        for vol in self:
+            for batch in vol.match(pattern):
+                found = []
+                for entry in batch:
+                    if entry in seen:
+                        continue
+                    if section and not entry.section:
+                        entry.section = section
+                    seen.add(entry)
+                    found.append(entry)
+                    if len(seen) >= max_results:
+                        yield found
+                        return
+                yield found
+
+    def search(self, query, max_results=50):
+        """
+        Full text search in all volumes that have full text index,
+        return entries for articles matching most query terms first,
+        then by relevance score.
+
+        """
+        found = []
+        for vol in self:
+            found.extend(vol.search(query, max_results))
+        found.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [entry for _, _, entry in found[:max_results]]
+
+    def suggest(self, word, max_results=10, time_limit=0.3):
+        """
+        Entries with titles similar to word, closest first. Meant to
+        be used when best_match finds nothing, spends no more than
+        about time_limit seconds.
+
+        """
+        word, section = split_word(word)
+        if not word:
+            return []
+        deadline = time.time() + time_limit
+        found = []
+        for vol in self:
+            if time.time() > deadline:
+                break
+            found.extend(vol.suggest(word, max_results, deadline))
+        found.sort(key=lambda item: item[0])
+        result = []
+        seen = set()
+        for _, entry in found:
+            if entry not in seen:
+                if section and not entry.section:
+                    entry.section = section
+                result.append(entry)
+                seen.add(entry)
+            if len(result) >= max_results:
+                break
+        return result
 
     def read(self, entry):
         vol = self.volume(entry.volume_id)
         if not vol:
             raise ArticleNotFound(entry)
-        result = vol.read(entry)
+        result = self._read(vol, entry)
         if isinstance(result, Article):
             return result
         if isinstance(result, Redirect):
@@ -697,17 +1580,99 @@ class Library(list):
                     return redirect
         raise ArticleNotFound(entry)
 
-    def _lookup(self, word, volumes, comparisons, max_from_vol):
+    def read_many(self, entries, batch_size=200):
+        """
+        Read articles for entries, yielding them in order of entries
+        (None for entries that can not be read). Entries are read in
+        batches: in each batch, articles are read in order of their
+        position in volume files, adjacent articles with one read, and
+        decompressed by read pool.
+
+        """
+        entries = list(entries)
+        for start in xrange(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            for result in self._read_batch(batch):
+                yield result
+
+    def _read_batch(self, entries):
+        contents = {}
+        by_vol = defaultdict(set)
+        for entry in entries:
+            key = (entry.volume_id, entry.index)
+            if key in contents:
+                continue
+            content = self.article_cache.get(key)
+            if content is None:
+                vol = self.volume(entry.volume_id)
+                if vol and 0 <= entry.index < len(vol):
+                    by_vol[vol].add((vol.article_ptr(entry.index),
+                                     entry.index))
+            contents[key] = content
+        futures = {}
+        for vol, items in by_vol.iteritems():
+            items = sorted(items)
+            ptrs = sorted(set(ptr for ptr, _ in items))
+            by_ptr = {}
+            for ptr, data in vol.read_compressed(ptrs):
+                by_ptr[ptr] = self.read_pool.submit(vol.decode_content, data)
+            for ptr, index in items:
+                futures[(vol.volume_id, index)] = by_ptr[ptr]
+        for entry in entries:
+            key = (entry.volume_id, entry.index)
+            content = contents.get(key)
+            if content is None and key in futures:
+                try:
+                    content = futures[key].result()
+                except Exception:
+                    logging.exception('Failed to read %r', entry)
+                else:
+                    contents[key] = content
+                    self.article_cache[key] = content
+            if content is None:
+                yield None
+                continue
+            result = make_read_result(entry, *content)
+            if isinstance(result, Redirect):
+                try:
+                    result = self.read(entry)
+                except (ArticleNotFound, TooManyRedirects):
+                    logging.debug('Failed to follow %r', result, exc_info=1)
+                    result = None
+            yield result
+
+    def _read(self, vol, entry):
+        key = (vol.volume_id, entry.index)
+        content = self.article_cache.get(key)
+        if content is None:
+            content = vol.read_content(entry.index)
+            self.article_cache[key] = content
+        return make_read_result(entry, *content)
+
+    def _lookup(self, word, volumes, comparisons, max_from_vol, cancel=None,
+                session=None):
         if not word:
             raise StopIteration
         word, section = split_word(word)
         counts = defaultdict(int)
         seen = set()
-        for cmp_func, strength in comparisons:
-            for vol in volumes:
+        keys = KeyContext(cancel)
+        tasks = [(vol, cmp_func, strength)
+                 for cmp_func, strength in comparisons
+                 for vol in volumes]
+        if self.lookup_pool and len(volumes) > 1:
+            results = self._parallel_lookup(word, tasks, max_from_vol, keys,
+                                            session)
+        else:
+            results = ((vol, self._lookup_volume(vol, word, cmp_func,
+                                                 strength, keys, session))
+                       for vol, cmp_func, strength in tasks)
+        try:
+            for vol, entries in results:
+                keys.check_cancelled()
                 count = counts[vol]
                 if count >= max_from_vol: continue
-                for entry in vol.lookup(word, strength, cmp_func):
+                for entry in entries:
                     if entry not in seen:
                         if section and not entry.section:
                             entry.section = section
@@ -716,16 +1681,98 @@ class Library(list):
                         count += 1
                         if count >= max_from_vol: break
                 counts[vol] = count
+        finally:
+            logging.debug('Query keys for %r: %d computed, %d reused',
+                          word, keys.misses, keys.hits)
+
+    def _parallel_lookup(self, word, tasks, max_from_vol, keys, session):
+        #No more than max_from_vol entries from one volume are ever
+        #needed: entries already seen in previous comparisons
+        #count towards the limit too
+        def lookup(task):
+            vol, cmp_func, strength = task
+            return vol, list(islice(self._lookup_volume(vol, word, cmp_func,
+                                                        strength, keys,
+                                                        session),
+                                    max_from_vol))
+        return self.lookup_pool.map(lookup, tasks)
+
+    def _lookup_volume(self, vol, word, cmp_func, strength, keys, session):
+        if session is None or cmp_func not in lookup_modes:
+            return vol.lookup(word, strength, cmp_func, keys)
+        return vol.lookup(word, strength, cmp_func, keys,
+                          session.bounds(vol, word, keys))
 
     def _redirect(self, redirect):
+        result = self._resolved_redirect(redirect)
+        if result is not None:
+            return result
         vol = self.volume(redirect.entry.volume_id)
         if vol:
             try:
                 entry = self._find(redirect.target, vol.uuid).next()
-                entry.redirect_from = redirect.entry
-                return self.read(entry)
             except StopIteration:
-                pass
+                return None
+            entry.redirect_from = redirect.entry
+            result = self.read(entry)
+            if not redirect.entry.section:
+                target = result.entry
+                self.redirect_cache[(redirect.entry.volume_id,
+                                     redirect.entry.index)] = (
+                    target.volume_id, target.index, target.section)
+            return result
+
+    def _resolved_redirect(self, redirect):
+        entry = redirect.entry
+        target = self.redirect_cache.get((entry.volume_id, entry.index))
+        if target is None:
+            vol = self.volume(entry.volume_id)
+            table = self.redirect_table(vol.uuid) if vol else None
+            if table:
+                target = table.get(entry.volume_id, entry.index)
+        if target is None:
+            return None
+        volume_id, index, section = target
+        vol = self.volume(volume_id)
+        if not vol:
+            return None
+        target_entry = Entry(volume_id, index, vol.words[index],
+                             section=entry.section or section,
+                             redirect_from=entry)
+        result = self._read(vol, target_entry)
+        if isinstance(result, Article):
+            return result
+        return None
+
+    def redirect_table(self, uuid):
+        if uuid not in self.redirect_tables:
+            self.redirect_tables[uuid] = redirects.open_table(uuid.hex)
+        return self.redirect_tables[uuid]
+
+    def build_redirect_table(self, uuid):
+        """
+        Resolve all redirects in dictionary and write redirect table,
+        yielding progress.
+
+        """
+        def resolve(volume_id, index):
+            vol = self.volume(volume_id)
+            _, redirect = vol.read_content(index)
+            if not redirect:
+                return None
+            try:
+                article = self.read(Entry(volume_id, index,
+                                          vol.words[index]))
+            except (ArticleNotFound, TooManyRedirects):
+                return None
+            target = article.entry
+            return target.volume_id, target.index, target.section
+        volumes = [(vol.volume_id, len(vol)) for vol in self.volumes(uuid)]
+        for progress in redirects.build_table(uuid.hex, volumes, resolve):
+            yield progress
+        table = self.redirect_tables.pop(uuid, None)
+        if table:
+            table.close()
 
     def _find(self, word, dictionary_id):
         return self._lookup(word, self.volumes(dictionary_id),
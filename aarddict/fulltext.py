@@ -0,0 +1,344 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Full text search over article bodies.
+
+Index is built per volume. Articles are tokenized in chunks of index
+numbers, each chunk is written to a run file of sorted (term, postings)
+records, so chunks can be processed by several processes and an
+interrupted build resumes with chunks not yet done. Runs are then merged
+into a sidecar holding delta-encoded posting lists (index number, term
+frequency) per normalized term.
+
+"""
+
+from __future__ import with_statement
+import os
+import re
+import math
+import heapq
+import shutil
+import logging
+import cPickle as pickle
+
+from bisect import bisect_left
+from collections import defaultdict
+
+from aarddict import sidecar
+from aarddict.fuzzy import normalize
+
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+log = logging.getLogger(__name__)
+
+KIND = 'ftxt'
+
+chunk_size = 20000
+
+POSTINGS, TERMS, DOC_FREQS, DOC_LENGTHS, STATS = range(5)
+
+tag_re = re.compile(r'<[^>]*>|&#?\w+;', re.UNICODE)
+word_re = re.compile(r'\w+', re.UNICODE)
+
+#BM25 parameters
+k1 = 1.2
+b = 0.75
+
+#terms in more articles than this don't tell articles apart and are
+#slow to decode: they are skipped if query has other terms, otherwise
+#only this many postings are used
+max_doc_freq = 100000
+
+
+def tokenize(text):
+    """
+    >>> tokenize(u'<p>Caf\\xe9 au <b>lait</b>&nbsp;x</p>')
+    [u'cafe', u'au', u'lait']
+    >>> tokenize('text ab 0')
+    [u'text', u'ab']
+
+    """
+    #json decoders return ascii strings as str
+    if isinstance(text, str):
+        text = text.decode('utf8')
+    text = tag_re.sub(u' ', text)
+    return [normalize(word) for word in word_re.findall(text)
+            if 1 < len(word) <= 40]
+
+
+def encode_postings(postings, previous=0):
+    """
+    Encode list of (index, term frequency) tuples sorted by index as
+    varints, index numbers are stored as deltas. Encoded lists can be
+    concatenated if `previous` is last index of preceding list.
+
+    >>> encode_postings([(3, 1), (300, 2)])
+    '\\x03\\x01\\xa9\\x02\\x02'
+    >>> decode_postings(encode_postings([(3, 1), (300, 2)]))
+    [(3, 1), (300, 2)]
+    >>> s = encode_postings([(3, 1)]) + encode_postings([(300, 2)], 3)
+    >>> decode_postings(s), decode_postings(s, limit=1)
+    ([(3, 1), (300, 2)], [(3, 1)])
+
+    """
+    out = []
+    for index, tf in postings:
+        for n in (index - previous, tf):
+            while n >= 0x80:
+                out.append(chr((n & 0x7f) | 0x80))
+                n >>= 7
+            out.append(chr(n))
+        previous = index
+    return ''.join(out)
+
+
+def decode_postings(s, limit=None):
+    result = []
+    values = []
+    n = shift = 0
+    max_values = None if limit is None else 2*limit
+    for c in s:
+        byte = ord(c)
+        n |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(n)
+            n = shift = 0
+            if len(values) == max_values:
+                break
+    index = 0
+    for i in xrange(0, len(values), 2):
+        index += values[i]
+        result.append((index, values[i+1]))
+    return result
+
+
+def _runs_dir(owner_id):
+    return sidecar.sidecar_path(owner_id, KIND) + '.runs'
+
+
+_volumes = {}
+
+def _index_chunk(args, vol=None):
+    """
+    Tokenize articles lo to hi of volume and write run file: doc
+    lengths for the chunk followed by (term, postings) records sorted
+    by term. Worker processes open volume once and keep it, in this
+    process already open volume is passed as `vol`.
+
+    """
+    file_name, lo, hi, run_file = args
+    if vol is None:
+        from aarddict.dictionary import Volume
+        vol = _volumes.get(file_name)
+        if vol is None:
+            vol = _volumes[file_name] = Volume(file_name)
+    postings = defaultdict(list)
+    doc_lengths = []
+    for index in xrange(lo, hi):
+        text, redirect = vol.read_content(index)
+        if redirect:
+            doc_lengths.append(0)
+            continue
+        terms = tokenize(text)
+        doc_lengths.append(len(terms))
+        tfs = defaultdict(int)
+        for term in terms:
+            tfs[term] += 1
+        for term, tf in tfs.iteritems():
+            postings[term.encode('utf8')].append((index, tf))
+    tmp_run_file = run_file + '.tmp'
+    with open(tmp_run_file, 'wb') as f:
+        pickle.dump(doc_lengths, f, pickle.HIGHEST_PROTOCOL)
+        for term in sorted(postings):
+            pickle.dump((term, postings[term]), f, pickle.HIGHEST_PROTOCOL)
+    os.rename(tmp_run_file, run_file)
+    return lo
+
+
+def _read_run(run_file):
+    with open(run_file, 'rb') as f:
+        pickle.load(f)
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                break
+
+
+def _read_doc_lengths(run_file):
+    with open(run_file, 'rb') as f:
+        return pickle.load(f)
+
+
+def build_index(volume, processes=None):
+    """
+    Write full text index for volume, yielding progress. Chunks
+    already indexed by an interrupted build are reused. Chunks are
+    tokenized by `processes` worker processes (number of CPUs by
+    default) when multiprocessing is available.
+
+    """
+    count = len(volume)
+    runs_dir = _runs_dir(volume.volume_id)
+    if not os.path.exists(runs_dir):
+        os.makedirs(runs_dir)
+    chunks = []
+    for lo in xrange(0, count, chunk_size):
+        run_file = os.path.join(runs_dir, '%010d' % lo)
+        chunks.append((volume.file_name, lo, min(lo + chunk_size, count),
+                       run_file))
+    todo = [chunk for chunk in chunks if not os.path.exists(chunk[-1])]
+    done = len(chunks) - len(todo)
+    total = float(len(chunks) or 1)
+    yield 0.8*done/total
+
+    pool = None
+    if multiprocessing and len(todo) > 1 and processes != 1:
+        try:
+            pool = multiprocessing.Pool(processes)
+        except Exception:
+            log.warning('Could not start worker processes, '
+                        'indexing in this process', exc_info=1)
+    try:
+        results = (pool.imap_unordered(_index_chunk, todo) if pool
+                   else (_index_chunk(chunk, volume) for chunk in todo))
+        for _ in results:
+            done += 1
+            yield 0.8*done/total
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    run_files = [chunk[-1] for chunk in chunks]
+    _write_index(volume.volume_id, run_files)
+    shutil.rmtree(runs_dir, ignore_errors=True)
+    yield 1.0
+
+
+def _merged_postings(run_files):
+    """
+    Yield (term, document frequency, encoded postings) for each term
+    in runs. Postings from each run are encoded as they are read, so
+    only compact encoded form of a term's postings is kept.
+
+    """
+    runs = [_read_run(run_file) for run_file in run_files]
+    current_term = None
+    parts = []
+    doc_freq = previous = 0
+    #runs cover consecutive index ranges, so records with equal terms
+    #come out of heapq.merge ordered by their first index and
+    #concatenated postings stay sorted
+    for term, postings in heapq.merge(*runs):
+        if term != current_term:
+            if current_term is not None:
+                yield current_term, doc_freq, ''.join(parts)
+            current_term = term
+            parts = []
+            doc_freq = previous = 0
+        parts.append(encode_postings(postings, previous))
+        doc_freq += len(postings)
+        previous = postings[-1][0]
+    if current_term is not None:
+        yield current_term, doc_freq, ''.join(parts)
+
+
+def _write_index(owner_id, run_files):
+    doc_lengths = []
+    for run_file in run_files:
+        doc_lengths.extend(_read_doc_lengths(run_file))
+    terms = []
+    doc_freqs = []
+    def encoded():
+        for term, doc_freq, encoded_postings in _merged_postings(run_files):
+            terms.append(term)
+            doc_freqs.append(doc_freq)
+            yield encoded_postings
+    writer = sidecar.SidecarWriter(owner_id, KIND)
+    try:
+        writer.add_strings(encoded())
+        writer.add_strings(terms)
+        writer.add_records('>L', ((df,) for df in doc_freqs))
+        writer.add_records('>L', ((length,) for length in doc_lengths))
+        doc_count = len([length for length in doc_lengths if length])
+        writer.add_records('>QQ', [(doc_count, sum(doc_lengths))])
+    except:
+        writer.abort()
+        raise
+    else:
+        writer.close()
+
+
+def open_index(owner_id):
+    index_sidecar = sidecar.open_sidecar(owner_id, KIND)
+    return FullTextIndex(index_sidecar) if index_sidecar else None
+
+
+class FullTextIndex(object):
+
+    def __init__(self, index_sidecar):
+        self.sidecar = index_sidecar
+        self.postings = index_sidecar[POSTINGS]
+        self.terms = index_sidecar[TERMS]
+        self.doc_freqs = index_sidecar[DOC_FREQS]
+        self.doc_lengths = index_sidecar[DOC_LENGTHS]
+        self.doc_count, total_length = index_sidecar[STATS][0]
+        self.avg_length = float(total_length)/(self.doc_count or 1)
+
+    def _term_index(self, term):
+        key = term.encode('utf8')
+        i = bisect_left(self.terms, key)
+        if i < len(self.terms) and self.terms[i] == key:
+            return i
+        return None
+
+    def search(self, query, max_results=50):
+        """
+        Return list of (matched term count, score, index) tuples for
+        articles containing query terms, best first.
+
+        """
+        found = []
+        for term in set(tokenize(query)):
+            i = self._term_index(term)
+            if i is not None:
+                found.append((self.doc_freqs[i][0], i))
+        found.sort()
+        rare = [item for item in found if item[0] <= max_doc_freq]
+        #with only common terms rarest one is used, and not in full
+        found = rare or found[:1]
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        for df, i in found:
+            idf = math.log(1 + (self.doc_count - df + 0.5)/(df + 0.5))
+            for index, tf in decode_postings(self.postings[i],
+                                             max_doc_freq):
+                length = self.doc_lengths[index][0]
+                norm = k1*(1 - b + b*length/self.avg_length)
+                scores[index] += idf*tf*(k1 + 1)/(tf + norm)
+                matched[index] += 1
+        ranked = sorted(((matched[index], score, index)
+                         for index, score in scores.iteritems()),
+                        reverse=True)
+        return ranked[:max_results]
+
+    def close(self):
+        self.sidecar.close()
@@ -0,0 +1,197 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Approximate word matching with a trigram index.
+
+Index maps each trigram of normalized words to the list of index
+numbers of words containing it. Candidates sharing enough trigrams with
+the query are then checked with edit distance.
+
+"""
+
+import sys
+import time
+import unicodedata
+
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from aarddict import sidecar
+
+KIND = 'tgrm'
+
+#only this many best candidates (by number of shared trigrams)
+#are checked with edit distance
+max_candidates = 300
+
+#stop merging posting lists once this many postings were counted
+max_postings = 200000
+
+
+def normalize(word):
+    """
+    >>> normalize(u'Caf\\xe9')
+    u'cafe'
+
+    """
+    decomposed = unicodedata.normalize('NFKD', word.lower())
+    return u''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def trigrams(word):
+    """
+    >>> sorted(trigrams(u'abcd'))
+    [u' ab', u'abc', u'bcd', u'cd ']
+    >>> sorted(trigrams(u'a'))
+    [u' a ']
+
+    """
+    padded = u' %s ' % word
+    return set(padded[i:i+3] for i in range(len(padded) - 2))
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Levenshtein distance between a and b, or max_distance + 1 if it
+    is greater than max_distance.
+
+    >>> edit_distance(u'kitten', u'sitting', 5)
+    3
+    >>> edit_distance(u'kitten', u'sitting', 2)
+    3
+    >>> edit_distance(u'abc', u'abc', 0)
+    0
+
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = range(len(b) + 1)
+    for i, ca in enumerate(a):
+        current = [i + 1]
+        for j, cb in enumerate(b):
+            current.append(min(previous[j + 1] + 1,
+                               current[j] + 1,
+                               previous[j] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+
+def _to_stored(postings):
+    if sys.byteorder == 'little':
+        postings.byteswap()
+    return postings.tostring()
+
+
+def _from_stored(s):
+    postings = array('I')
+    postings.fromstring(s)
+    if sys.byteorder == 'little':
+        postings.byteswap()
+    return postings
+
+
+def build_index(owner_id, words, count):
+    """
+    Write trigram index for `words` (an iterable of `count` unicode
+    strings), yielding progress as words are processed.
+
+    """
+    postings = defaultdict(lambda: array('I'))
+    for i, word in enumerate(words):
+        for gram in trigrams(normalize(word)):
+            postings[gram].append(i)
+        if i % 10000 == 0:
+            yield 0.9*i/(count or 1)
+    keys = sorted((gram.encode('utf8'), gram) for gram in postings)
+    writer = sidecar.SidecarWriter(owner_id, KIND)
+    try:
+        writer.add_strings(key for key, _ in keys)
+        writer.add_strings(_to_stored(postings[gram]) for _, gram in keys)
+    except:
+        writer.abort()
+        raise
+    else:
+        writer.close()
+    yield 1.0
+
+
+def open_index(owner_id):
+    index_sidecar = sidecar.open_sidecar(owner_id, KIND)
+    return TrigramIndex(index_sidecar) if index_sidecar else None
+
+
+class TrigramIndex(object):
+
+    def __init__(self, index_sidecar):
+        self.sidecar = index_sidecar
+        self.keys = index_sidecar[0]
+        self.postings = index_sidecar[1]
+
+    def _postings(self, gram):
+        key = gram.encode('utf8')
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return _from_stored(self.postings[i])
+        return array('I')
+
+    def search(self, word, get_word, max_results=10,
+               max_distance=None, deadline=None):
+        """
+        Find words within edit distance of `word`, return list of
+        (distance, index) tuples, closest first. `get_word` returns
+        word for index number. Search returns what it found so far
+        when `deadline` (a time.time() value) has passed.
+
+        """
+        query = normalize(word)
+        if max_distance is None:
+            max_distance = 1 if len(query) <= 4 else 2
+        grams = trigrams(query)
+        #each edit changes at most three trigrams
+        required = max(len(grams) - 3*max_distance, 1)
+        posting_lists = sorted((self._postings(gram) for gram in grams),
+                               key=len)
+        counts = defaultdict(int)
+        processed = 0
+        total = 0
+        for postings in posting_lists:
+            if total > max_postings:
+                break
+            if deadline and time.time() > deadline:
+                break
+            for i in postings:
+                counts[i] += 1
+            total += len(postings)
+            processed += 1
+        skipped = len(posting_lists) - processed
+        min_count = max(required - skipped, 1)
+        candidates = sorted((-count, i) for i, count in counts.iteritems()
+                            if count >= min_count)[:max_candidates]
+        found = []
+        for neg_count, i in candidates:
+            if deadline and time.time() > deadline:
+                break
+            distance = edit_distance(query, normalize(get_word(i)),
+                                     max_distance)
+            if distance <= max_distance:
+                found.append((distance, neg_count, i))
+        found.sort()
+        return [(distance, int(i)) for distance, _, i in found[:max_results]]
+
+    def close(self):
+        self.sidecar.close()
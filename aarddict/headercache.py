@@ -0,0 +1,130 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Parsed volume headers and metadata summaries.
+
+Opening a volume requires reading its header and decompressing and
+parsing metadata, which for Wikipedia includes the whole site info. This
+module keeps parsed header, metadata values needed to open a volume
+and article url in a json file in application directory, keyed by
+absolute file name and valid while file size and modification time
+stay the same.
+
+"""
+
+from __future__ import with_statement
+import os
+import logging
+
+from threading import Lock
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from aarddict import jsonstore
+
+log = logging.getLogger(__name__)
+
+manifest_file = os.path.expanduser('~/.aarddict/volumes.json')
+
+#metadata keys stored in manifest, other metadata is read
+#from volume file when needed
+summary_keys = ('article_count', 'index_language', 'article_language',
+                'title', 'version', 'description', 'copyright', 'license',
+                'source', 'language_links', 'lang', 'sitelang')
+
+_lock = Lock()
+_entries = None
+
+
+def _identity(file_name):
+    st = os.stat(file_name)
+    return dict(size=st.st_size, mtime=st.st_mtime)
+
+
+def _load():
+    global _entries
+    if _entries is None:
+        _entries = jsonstore.load(manifest_file)
+    return _entries
+
+
+def _encode_header(header):
+    encoded = dict(header)
+    encoded['uuid'] = header['uuid'].encode('hex')
+    return encoded
+
+
+def _decode_header(encoded):
+    header = {}
+    for name, value in encoded.iteritems():
+        if isinstance(value, unicode):
+            value = value.encode('ascii')
+        header[str(name)] = value
+    header['uuid'] = header['uuid'].decode('hex')
+    return header
+
+
+def summary(metadata):
+    return dict((key, metadata[key]) for key in summary_keys
+                if key in metadata)
+
+
+def get(file_name):
+    """
+    Return (header, metadata summary, article url) cached for file or
+    None if file is not in manifest or has changed.
+
+    """
+    try:
+        identity = _identity(file_name)
+    except EnvironmentError:
+        return None
+    with _lock:
+        entry = _load().get(jsonstore.file_key(file_name))
+    if not entry or entry.get('identity') != identity:
+        return None
+    try:
+        header = _decode_header(entry['header'])
+    except (KeyError, TypeError, ValueError, UnicodeError):
+        log.debug('Ignoring bad manifest entry for %s', file_name,
+                  exc_info=1)
+        return None
+    return header, entry['summary'], entry['article_url']
+
+
+def put(file_name, header, metadata_summary, article_url):
+    try:
+        identity = _identity(file_name)
+    except EnvironmentError:
+        return
+    entry = dict(identity=identity,
+                 header=_encode_header(header),
+                 summary=metadata_summary,
+                 article_url=article_url)
+    try:
+        json.dumps(entry)
+    except (TypeError, ValueError, UnicodeError):
+        log.debug('Not caching header of %s', file_name, exc_info=1)
+        return
+    with _lock:
+        entries = _load()
+        entries[jsonstore.file_key(file_name)] = entry
+        try:
+            jsonstore.save(manifest_file, entries)
+        except EnvironmentError:
+            log.warning('Could not write %s', manifest_file, exc_info=1)
@@ -0,0 +1,120 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Vectorized access to volume index (requires NumPy).
+
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+available = numpy is not None
+
+_dtype_codes = {'b': 'i1', 'B': 'u1', 'h': 'i2', 'H': 'u2',
+                'i': 'i4', 'I': 'u4', 'l': 'i4', 'L': 'u4',
+                'q': 'i8', 'Q': 'u8'}
+
+_byte_orders = {'>': '>', '!': '>', '<': '<', '=': '=', '@': '='}
+
+
+def index1_fields(index1_item_format):
+    """
+    Translate struct format of index1 items into list of NumPy
+    field specs. First field is key position, last is article pointer.
+
+    >>> index1_fields('>LL')
+    [('key_pos', '>u4'), ('article_ptr', '>u4')]
+    >>> index1_fields('>LHL')
+    [('key_pos', '>u4'), ('f1', '>u2'), ('article_ptr', '>u4')]
+    >>> index1_fields('>2L ')
+    [('key_pos', '>u4'), ('article_ptr', '>u4')]
+
+    """
+    fmt = index1_item_format.replace('\0', '').replace(' ', '')
+    byte_order = '='
+    if fmt and fmt[0] in _byte_orders:
+        byte_order = _byte_orders[fmt[0]]
+        fmt = fmt[1:]
+    codes = []
+    count = ''
+    for c in fmt:
+        if c.isdigit():
+            count += c
+        elif c in _dtype_codes:
+            codes.extend([byte_order + _dtype_codes[c]]*int(count or 1))
+            count = ''
+        else:
+            raise ValueError('Unsupported index item format %r'
+                             % index1_item_format)
+    if len(codes) < 2:
+        raise ValueError('Unsupported index item format %r'
+                         % index1_item_format)
+    names = (['key_pos'] +
+             ['f%d' % i for i in range(1, len(codes) - 1)] +
+             ['article_ptr'])
+    return zip(names, codes)
+
+
+class IndexArray(object):
+    """
+    Structured array view over index1 table of a volume. Data is not
+    copied, array is backed by volume's memory map.
+
+    """
+
+    def __init__(self, fmap, offset, count, index1_item_format):
+        if not available:
+            raise ImportError('NumPy is required for vectorized index access')
+        dtype = numpy.dtype(index1_fields(index1_item_format))
+        self.array = numpy.frombuffer(fmap, dtype=dtype,
+                                      count=count, offset=offset)
+        self._article_order = None
+
+    def __len__(self):
+        return len(self.array)
+
+    def key_pos(self, indices=slice(None)):
+        """Key positions for an index, slice or array of indexes"""
+        return self.array['key_pos'][indices]
+
+    def article_ptr(self, indices=slice(None)):
+        """Article pointers for an index, slice or array of indexes"""
+        return self.array['article_ptr'][indices]
+
+    def article_order(self):
+        """
+        Index numbers sorted by article pointer, i.e. in the order
+        articles are stored in the file.
+
+        """
+        if self._article_order is None:
+            self._article_order = numpy.argsort(self.article_ptr(),
+                                                kind='mergesort')
+        return self._article_order
+
+    def sorted_article_ptrs(self):
+        return self.article_ptr(self.article_order())
+
+    def articles_in_range(self, start, end):
+        """
+        Index numbers of articles whose data begins at article offset
+        in [start, end), in file order.
+
+        """
+        ptrs = self.sorted_article_ptrs()
+        lo, hi = numpy.searchsorted(ptrs, [start, end], side='left')
+        return self.article_order()[lo:hi]
@@ -0,0 +1,74 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Json files in application directory holding records keyed by
+volume file name.
+
+"""
+
+from __future__ import with_statement
+import os
+import logging
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+log = logging.getLogger(__name__)
+
+
+def file_key(file_name):
+    """
+    Return absolute file name as unicode, suitable as json key.
+
+    """
+    file_name = os.path.abspath(file_name)
+    if isinstance(file_name, str):
+        file_name = file_name.decode('utf8', 'replace')
+    return file_name
+
+
+def load(store_file):
+    """
+    Return dictionary stored in `store_file`, empty if file doesn't
+    exist or can't be read.
+
+    """
+    try:
+        with open(store_file, 'rb') as f:
+            return json.load(f)
+    except EnvironmentError:
+        return {}
+    except ValueError:
+        log.warning('Ignoring invalid %s', store_file, exc_info=1)
+        return {}
+
+
+def save(store_file, data, indent=None):
+    """
+    Write `data` to `store_file`, replacing it only once new content
+    is completely written.
+
+    """
+    store_dir = os.path.dirname(store_file)
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    tmp_file = store_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        json.dump(data, f, indent=indent)
+    if os.name == 'nt' and os.path.exists(store_file):
+        os.remove(store_file)
+    os.rename(tmp_file, store_file)
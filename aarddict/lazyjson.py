@@ -0,0 +1,120 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Partial decoding of serialized articles.
+
+Article is stored as json list [text, tags, meta], meta is optional.
+Viewer only needs text and meta (to tell redirects), so text is decoded
+from the start of the string and meta from the end, while tags, which
+may be larger than text, are skipped.
+
+"""
+
+import re
+
+
+def _pick_json():
+    #prefer implementation with C scanner
+    candidates = []
+    try:
+        import simplejson
+        candidates.append(simplejson)
+    except ImportError:
+        pass
+    try:
+        import json
+        candidates.append(json)
+    except ImportError:
+        pass
+    for module in candidates:
+        if getattr(module.scanner, 'c_make_scanner', None):
+            return module
+    return candidates[0]
+
+json = _pick_json()
+
+loads = json.loads
+scanstring = json.decoder.scanstring
+_decoder = json.JSONDecoder()
+
+_text_start_re = re.compile(r'\[\s*"')
+_meta_end_re = re.compile(r'\s*\]\s*\Z')
+
+#meta is small, give up looking for its start
+#this far from the end of string
+max_meta_size = 64*1024
+
+
+def _decode_meta(s):
+    end = len(s)
+    limit = max(0, end - max_meta_size)
+    pos = s.rfind('{', limit, end)
+    while pos >= 0:
+        try:
+            meta, meta_end = _decoder.raw_decode(s, pos)
+        except ValueError:
+            pass
+        else:
+            if (isinstance(meta, dict) and _meta_end_re.match(s, meta_end) and
+                s[limit:pos].rstrip().endswith(',')):
+                return meta
+        pos = s.rfind('{', limit, pos)
+    return None
+
+
+def decode_article(s):
+    """
+    Return (text, meta) decoded from serialized article `s`. Text is
+    always unicode, even if json implementation returns ascii strings
+    as str.
+
+    >>> decode_article('["abc", [["b", 0, 1, {}]], {"r": "x"}]') == (
+    ...     u'abc', {u'r': u'x'})
+    True
+    >>> decode_article('["a{b}", [["b", 0, 1, {"c": "{}"}]]]') == (
+    ...     u'a{b}', {})
+    True
+    >>> decode_article('["", [], {"r": "}, {\\\\"x\\\\": 1}"}]') == (
+    ...     u'', {u'r': u'}, {"x": 1}'})
+    True
+    >>> decode_article('["caf\\xc3\\xa9", []]') == (u'caf\\xe9', {})
+    True
+    >>> type(decode_article('["abc", []]')[0])
+    <type 'unicode'>
+
+    """
+    m = _text_start_re.match(s)
+    if m:
+        text, _ = scanstring(s, m.end(), 'utf-8', True)
+        if s.rstrip().endswith('}]'):
+            meta = _decode_meta(s)
+        else:
+            meta = {}
+        if meta is not None:
+            return _unicode(text), meta
+    articletuple = loads(s)
+    if len(articletuple) == 3:
+        text, _, meta = articletuple
+    else:
+        text, _ = articletuple
+        meta = {}
+    return _unicode(text), meta
+
+
+def _unicode(text):
+    #C scanners return ascii strings as str
+    if isinstance(text, str):
+        return text.decode('utf8')
+    return text
@@ -0,0 +1,209 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+from __future__ import with_statement
+import sys
+import logging
+
+from threading import Thread, Lock, Event, Condition
+from Queue import Queue
+
+log = logging.getLogger(__name__)
+
+
+class Cancelled(Exception): pass
+
+
+class Future(object):
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.lock = Lock()
+        self.finished = Event()
+        self.started = False
+        self.cancelled = False
+        self.value = None
+        self.exc_info = None
+
+    def run(self):
+        with self.lock:
+            if self.cancelled:
+                return
+            self.started = True
+        try:
+            self.value = self.func(*self.args, **self.kwargs)
+        except:
+            self.exc_info = sys.exc_info()
+        del self.func, self.args, self.kwargs
+        self.finished.set()
+
+    def cancel(self):
+        """
+        Prevent function from running if it hasn't started yet,
+        return True if it won't run.
+
+        """
+        with self.lock:
+            if not self.started:
+                self.cancelled = True
+                self.finished.set()
+            return self.cancelled
+
+    def done(self):
+        return self.finished.isSet()
+
+    def result(self, timeout=None):
+        self.finished.wait(timeout)
+        if self.cancelled:
+            raise Cancelled
+        if self.exc_info:
+            exc_type, exc_value, tb = self.exc_info
+            raise exc_type, exc_value, tb
+        return self.value
+
+
+class WorkerPool(object):
+    """
+    Fixed number of daemon threads running submitted functions in
+    submission order.
+
+    >>> pool = WorkerPool(2)
+    >>> pool.submit(sum, [1, 2]).result()
+    3
+    >>> list(pool.map(lambda x: x*x, range(5)))
+    [0, 1, 4, 9, 16]
+    >>> pool.shutdown()
+
+    """
+
+    def __init__(self, size, name='worker'):
+        self.size = size
+        self.name = name
+        self.queue = Queue()
+        self.threads = []
+
+    def _start_threads(self):
+        while len(self.threads) < self.size:
+            t = Thread(target=self._work,
+                       name='%s-%d' % (self.name, len(self.threads)))
+            t.setDaemon(True)
+            t.start()
+            self.threads.append(t)
+
+    def _work(self):
+        while True:
+            future = self.queue.get()
+            if future is None:
+                break
+            future.run()
+
+    def submit(self, func, *args, **kwargs):
+        if not self.threads:
+            self._start_threads()
+        future = Future(func, args, kwargs)
+        self.queue.put(future)
+        return future
+
+    def map(self, func, iterable):
+        """
+        Run func for each item and yield results in the order of items
+        as they become available. Items not yet processed when
+        generator is closed are cancelled.
+
+        """
+        futures = [self.submit(func, item) for item in iterable]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        self.threads = []
+
+
+class LatestWorker(object):
+    """
+    Single daemon thread running only the most recently submitted
+    function. Submitting cancels function still waiting to run and
+    sets `cancel` event passed to the running one, which is expected
+    to check it and return early.
+
+    >>> worker = LatestWorker()
+    >>> worker.submit(lambda x, cancel: x + 1, 1).result()
+    2
+    >>> worker.shutdown()
+
+    """
+
+    def __init__(self, name='latest'):
+        self.name = name
+        self.condition = Condition(Lock())
+        self.pending = None
+        self.running = None
+        self.thread = None
+        self.stopped = False
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    break
+                future = self.running = self.pending
+                self.pending = None
+            future.run()
+            with self.condition:
+                self.running = None
+
+    def submit(self, func, *args, **kwargs):
+        cancel = Event()
+        kwargs['cancel'] = cancel
+        future = Future(func, args, kwargs)
+        future.cancel_event = cancel
+        with self.condition:
+            self._cancel()
+            self.pending = future
+            if self.thread is None:
+                self.stopped = False
+                self.thread = Thread(target=self._work, name=self.name)
+                self.thread.setDaemon(True)
+                self.thread.start()
+            self.condition.notify()
+        return future
+
+    def _cancel(self):
+        if self.pending is not None:
+            self.pending.cancel()
+            self.pending = None
+        if self.running is not None:
+            self.running.cancel_event.set()
+
+    def cancel(self):
+        """Cancel pending function and ask running one to stop"""
+        with self.condition:
+            self._cancel()
+
+    def shutdown(self):
+        with self.condition:
+            self._cancel()
+            self.stopped = True
+            self.thread = None
+            self.condition.notify()
@@ -24,6 +24,7 @@ import re
 import traceback
 
 from collections import defaultdict, deque
+from itertools import chain
 
 from PyQt4.QtCore import (QObject, Qt, QThread, QTranslator, QLocale,
                           QTimer, QUrl, QVariant, pyqtProperty, pyqtSlot,
@@ -56,10 +57,17 @@ from aarddict.dictionary import (format_title,
                                  Entry,
                                  Article,
                                  cmp_words,
-                                 VerifyError)
+                                 read_volume_id,
+                                 getsizeof,
+                                 VerifyError,
+                                 LookupCancelled)
+from aarddict.pool import WorkerPool, LatestWorker
+from aarddict.cache import LRUCache
+from aarddict.wildcard import is_pattern
 
 from aarddict import state, res
 from aarddict.res import icons
+from aarddict.verification import format_time as format_verification_time
 
 log = logging.getLogger(__name__)
 
@@ -69,6 +77,15 @@ http_link_re = re.compile("http[s]?://[^\s\)]+",
                           re.UNICODE)
 max_history = 50
 
+#number of first word completion items whose articles are
+#loaded in background after lookup
+prefetch_groups = 3
+
+#when loading all tabs, load at most this many besides current one...
+eager_tab_limit = 10
+#...and stop after this many bytes of article text
+eager_tab_memory = 8*1024*1024
+
 
 def linkify(text):
     return http_link_re.sub(lambda m: '<a href="%(target)s">%(target)s</a>'
@@ -160,47 +177,94 @@ class Matcher(QObject):
 matcher = Matcher()
 
 
-class WordLookupStopRequested(Exception): pass
-
+class WordLookup(QObject):
+    """
+    Looks up words one at a time on a long-lived worker thread. Only
+    the latest word is looked up: starting a lookup cancels the one
+    in progress, which stops inside volume lookups rather than when
+    it gets to the next entry. Signals are emitted from worker thread.
 
-class WordLookupThread(QThread):
+    """
 
     match_found = pyqtSignal(QString, object)
     stopped = pyqtSignal(QString)
     done = pyqtSignal(QString, list)
+    suggestions_found = pyqtSignal(QString, list)
     lookup_failed = pyqtSignal(QString, QString)
 
-    def __init__(self, dictionaries, word, parent=None):
-        QThread.__init__(self, parent)
+    def __init__(self, dictionaries, parent=None):
+        QObject.__init__(self, parent)
         self.dictionaries = dictionaries
-        self.word = word
-        self.stop_requested = False
+        self.worker = LatestWorker(name='word-lookup')
 
-    def run(self):
-        wordstr = unicode(self.word)
+    def lookup(self, word):
+        self.worker.submit(self.run, QString(word))
+
+    def stop(self):
+        self.worker.cancel()
+
+    def shutdown(self):
+        self.worker.shutdown()
+
+    def run(self, word, cancel):
+        wordstr = unicode(word)
         log.debug("Looking up %r", wordstr)
         t0 = time.time()
         entries = []
+        seen = set()
+        batches = ([entry] for entry
+                   in self.dictionaries.best_match(wordstr, cancel=cancel))
+        if is_pattern(wordstr):
+            #titles may contain wildcard characters themselves,
+            #so wildcard matches come after best matches
+            batches = chain(batches, self.dictionaries.match(wordstr))
         try:
-            for entry in self.dictionaries.best_match(wordstr):
-                if self.stop_requested:
-                    raise WordLookupStopRequested
-                else:
+            for batch in batches:
+                if cancel.isSet():
+                    raise LookupCancelled
+                for entry in batch:
+                    if entry in seen:
+                        continue
+                    seen.add(entry)
                     entries.append(entry)
-                    self.match_found.emit(self.word, entry)
-            if self.stop_requested:
-                raise WordLookupStopRequested
-        except WordLookupStopRequested:
-            self.stopped.emit(self.word)
+                    self.match_found.emit(word, entry)
+            if cancel.isSet():
+                raise LookupCancelled
+        except LookupCancelled:
+            log.debug('Lookup for %r cancelled after %ss',
+                      wordstr, time.time() - t0)
+            self.stopped.emit(word)
         except Exception:
-            self.lookup_failed.emit(self.word,
+            self.lookup_failed.emit(word,
                                     u''.join(traceback.format_exc()))
         else:
             log.debug('Looked up %r in %ss', wordstr, time.time() - t0)
-            self.done.emit(self.word, entries)
+            self.done.emit(word, entries)
+            if not entries and not is_pattern(wordstr):
+                self.suggest(word, cancel)
 
-    def stop(self):
-        self.stop_requested = True
+    def suggest(self, word, cancel):
+        wordstr = unicode(word)
+        t0 = time.time()
+        try:
+            suggestions = self.dictionaries.suggest(wordstr)
+        except Exception:
+            log.exception('Failed to find suggestions for %r', wordstr)
+        else:
+            log.debug('Found %d suggestion(s) for %r in %ss',
+                      len(suggestions), wordstr, time.time() - t0)
+            if suggestions and not cancel.isSet():
+                self.suggestions_found.emit(word, suggestions)
+
+
+def render_article(article, entry):
+    """
+    Put article text loaded for entry in article page template.
+
+    """
+    redirect = None if article.entry == entry else entry.title
+    article.text = res.article(article.text, redirect)
+    return article
 
 
 class ArticleLoadThread(QThread):
@@ -208,17 +272,22 @@ class ArticleLoadThread(QThread):
     article_loaded = pyqtSignal(WebView)
     article_load_failed = pyqtSignal(WebView, QString)
 
-    def __init__(self, dictionaries, view, parent=None):
+    def __init__(self, dictionaries, view, render_cache=None, parent=None):
         QThread.__init__(self, parent)
         self.dictionaries = dictionaries
         self.view = view
+        self.render_cache = render_cache
         self.view.loading = True
 
     def run(self):
         try:
-            article = self._load_article(self.view.entry)
-            redirect = None if article.entry == self.view.entry else self.view.entry.title
-            article.text = res.article(article.text, redirect)
+            entry = self.view.entry
+            article = (self.render_cache.get(entry)
+                       if self.render_cache is not None else None)
+            if article is None:
+                article = render_article(self._load_article(entry), entry)
+                if self.render_cache is not None:
+                    self.render_cache[entry] = article
         except:
             log.exception('Failed to load article for %r', self.view.entry)
             self.article_load_failed.emit(self.view,
@@ -248,12 +317,72 @@ class ArticleLoadThread(QThread):
         return article
 
 
+class ArticlePrefetchThread(QThread):
+    """
+    Loads and renders articles for entries into render cache ahead
+    of time, so that they are shown without delay when selected.
+    Stops after `max_size` bytes of article text if specified.
+
+    """
+
+    article_ready = pyqtSignal(object)
+
+    def __init__(self, dictionaries, entries, render_cache, max_size=None,
+                 parent=None):
+        QThread.__init__(self, parent)
+        self.dictionaries = dictionaries
+        self.entries = list(entries)
+        self.render_cache = render_cache
+        self.max_size = max_size
+        self.stop_requested = False
+
+    def run(self):
+        t0 = time.time()
+        count = 0
+        size = 0
+        try:
+            #articles already rendered are not read again, but
+            #are still reported as ready
+            to_read = [entry for entry in self.entries
+                       if entry not in self.render_cache]
+            articles = iter(self.dictionaries.read_many(to_read))
+            for entry in self.entries:
+                if self.stop_requested:
+                    break
+                if self.max_size is not None and size >= self.max_size:
+                    log.debug('Stopped prefetch after %d bytes', size)
+                    break
+                if entry in to_read:
+                    article = articles.next()
+                    if article is None:
+                        continue
+                    article = render_article(article, entry)
+                    self.render_cache[entry] = article
+                    count += 1
+                else:
+                    article = self.render_cache.get(entry)
+                    if article is None:
+                        #evicted since
+                        continue
+                size += getsizeof(article.text)
+                self.article_ready.emit(entry)
+        except Exception:
+            log.exception('Failed to prefetch articles')
+        log.debug('Prefetched %d article(s) in %ss', count, time.time() - t0)
+
+    def stop(self):
+        self.stop_requested = True
+
+
 class DictOpenThread(QThread):
 
     dict_open_failed = pyqtSignal(str, str)
     dict_open_succeded = pyqtSignal(Volume)
     dict_open_started = pyqtSignal(int)
 
+    #number of files listed and opened at the same time
+    workers = 4
+
     def __init__(self, sources, dictionaries, parent=None):
         QThread.__init__(self, parent)
         self.sources = sources
@@ -261,28 +390,81 @@ class DictOpenThread(QThread):
         self.dictionaries = dictionaries
 
     def run(self):
+        pool = WorkerPool(self.workers, name='dict-open')
+        try:
+            self._open(pool)
+        finally:
+            pool.shutdown()
+
+    def _open(self, pool):
         ext = os.path.extsep + 'aar'
-        files = []
 
-        for source in self.sources:
+        def list_source(source):
             if os.path.isfile(source):
-                files.append(source)
+                return [source]
+            found = []
             if os.path.isdir(source):
-                for f in os.listdir(source):
+                for f in sorted(os.listdir(source)):
                     s = os.path.join(source, f)
                     if os.path.isfile(s) and f.lower().endswith(ext):
-                        files.append(s)
+                        found.append(s)
+            return found
+
+        def call(func, *args):
+            try:
+                return func(*args), None
+            except Exception, e:
+                return None, e
+
+        files = []
+        for found in pool.map(list_source, self.sources):
+            files.extend(found)
         self.dict_open_started.emit(len(files))
-        for candidate in files:
+
+        #header only check, so that files already opened or
+        #duplicating files listed before them are not opened again
+        volume_ids = list(pool.map(lambda f: call(read_volume_id, f), files))
+        first_with_id = {}
+        for candidate, (volume_id, _) in zip(files, volume_ids):
+            if volume_id and volume_id not in first_with_id:
+                first_with_id[volume_id] = candidate
+
+        def open_candidate(candidate, volume_id):
+            if (volume_id and (self.dictionaries.volume(volume_id) or
+                               first_with_id[volume_id] != candidate)):
+                return None, None
+            return call(Volume, candidate)
+
+        futures = [pool.submit(open_candidate, candidate, volume_id)
+                   for candidate, (volume_id, _) in zip(files, volume_ids)]
+        for i, future in enumerate(futures):
             if self.stop_requested:
+                self._discard(futures[i:])
                 return
-            try:
-                vol = self.dictionaries.add(candidate)
-            except Exception, e:
-                self.dict_open_failed.emit(candidate, str(e))
+            vol, error = future.result()
+            candidate = files[i]
+            if vol is None and error is None:
+                #skipped as duplicate, but first file with this id
+                #may have failed to open
+                volume_id, _ = volume_ids[i]
+                vol = self.dictionaries.volume(volume_id)
+                if vol is None:
+                    vol, error = call(self.dictionaries.add, candidate)
+            elif vol is not None:
+                vol = self.dictionaries.add_volume(vol)
+            if error:
+                self.dict_open_failed.emit(candidate, str(error))
             else:
                 self.dict_open_succeded.emit(vol)
 
+    def _discard(self, futures):
+        #volumes already opened by workers are not added, close them
+        for future in futures:
+            if not future.cancel():
+                vol, _ = future.result()
+                if vol is not None:
+                    vol.close()
+
     def stop(self):
         self.stop_requested = True
 
@@ -292,21 +474,24 @@ class VolumeVerifyThread(QThread):
     verified = pyqtSignal(bool)
     progress = pyqtSignal(float)
 
-    def __init__(self, volume, parent=None):
+    def __init__(self, volume, force=False, parent=None):
         QThread.__init__(self, parent)
         self.volume = volume
+        self.force = force
+        self.error = None
         self.stop_requested = False
 
     def run(self):
         try:
-            for progress in self.volume.verify():
+            for progress in self.volume.verify(force=self.force):
                 if self.stop_requested:
                     return
                 if progress > 1.0:
                     progress = 1.0
                 if not self.stop_requested:
                     self.progress.emit(progress)
-        except VerifyError:
+        except VerifyError, e:
+            self.error = e
             self.verified.emit(False)
         else:
             self.verified.emit(True)
@@ -500,8 +685,12 @@ class TabWidget(QTabWidget):
         self.toolbar.hide()
         self.status.setText(msg)
 
-    def show_nothing(self, fullscreen):
-        self.status.setText(_('Nothing found'))
+    def show_nothing(self, fullscreen, suggested=False):
+        if suggested:
+            self.status.setText(_('Nothing found. Did you mean one of '
+                                  'the words in the list?'))
+        else:
+            self.status.setText(_('Nothing found'))
         if fullscreen:
             self.toolbar.show()
         else:
@@ -544,6 +733,24 @@ def article_grouping_key(article):
     return collation_key(title, strength).getByteArray()
 
 
+def group_entries(entries):
+    """
+    Group entries for the same article. Groups are in order of their
+    first entries.
+
+    """
+    groups = []
+    groups_by_key = {}
+    for entry in entries:
+        article_key = article_grouping_key(entry)
+        if article_key in groups_by_key:
+            groups_by_key[article_key].append(entry)
+        else:
+            group = groups_by_key[article_key] = [entry]
+            groups.append(group)
+    return groups
+
+
 def fix_float_title(widget, title_key, floating):
     title = _(title_key)
     if floating:
@@ -828,6 +1035,13 @@ class DictView(QMainWindow):
                                self.toggle_full_screen, checkable=True)
         self.action_full_screen = action_full_screen
 
+        action_eager_tabs = a(_('&Load All Tabs'), None,
+                              _('Load articles from all dictionaries in '
+                                'background, not just from the current one'),
+                              None, self.toggle_eager_tab_loading,
+                              checkable=True)
+        self.action_eager_tabs = action_eager_tabs
+
         action_about = a(_('&About...'), 'help-about',
                          _('Information about Aard Dictionary'),
                          None, self.about)
@@ -865,7 +1079,9 @@ class DictView(QMainWindow):
                           action_article_find,
                           action_save_article,
                           action_online_article,
-                          action_article_appearance))
+                          action_article_appearance,
+                          None,
+                          action_eager_tabs))
 
         menubar.addMenu(m(_('&View'),
                           self.dock_lookup_pane.toggleViewAction(),
@@ -960,7 +1176,30 @@ class DictView(QMainWindow):
 
         self.tabs.currentChanged.connect(self.article_tab_switched)
 
-        self.current_lookup_thread = None
+        #word being looked up, None when no lookup is in progress
+        self.current_lookup = None
+        self.word_lookup = WordLookup(self.dictionaries, self)
+        self.word_lookup.lookup_failed.connect(self.word_lookup_failed,
+                                               Qt.QueuedConnection)
+        self.word_lookup.done.connect(self.word_lookup_finished,
+                                      Qt.QueuedConnection)
+        self.word_lookup.suggestions_found.connect(self.word_lookup_suggested,
+                                                   Qt.QueuedConnection)
+        self.current_prefetch_thread = None
+        #cleared while word completion selection is set by lookup
+        self.prefetch_on_selection = True
+        self.current_tabs_thread = None
+        #when set, articles for all tabs of selected article group
+        #are loaded in background, not just for current tab
+        self.eager_tab_loading = False
+        #rendered articles by entry, loaded when shown or prefetched
+        self.render_cache = LRUCache(
+            max_size=32*1024*1024,
+            sizeof=lambda article: getsizeof(article.text),
+            name='rendered articles')
+        #grouped lookup results by (word, library generation)
+        self.completion_cache = LRUCache(max_size=200, name='completions')
+        self.current_lookup_key = None
 
         self.sources = []
         self.zoom_factor = 1.0
@@ -1161,7 +1400,12 @@ class DictView(QMainWindow):
     def update_preferred_dicts(self, dict_uuid=None):
         if dict_uuid:
             self.preferred_dicts[dict_uuid.hex] = time.time()
-        self.dictionaries.sort(key=lambda d: -self.preferred_dicts.get(d.uuid.hex, 0))
+        preferred = sorted(self.dictionaries,
+                           key=lambda d: -self.preferred_dicts.get(d.uuid.hex, 0))
+        #sorting changes library generation, which invalidates
+        #cached completions, so only sort when order changes
+        if preferred != list(self.dictionaries):
+            self.dictionaries.sort(key=lambda d: -self.preferred_dicts.get(d.uuid.hex, 0))
 
     def schedule(self, func, delay=500):
         if self.scheduled_func:
@@ -1184,58 +1428,85 @@ class DictView(QMainWindow):
         loading_item = QListWidgetItem(_('Loading...'))
         loading_item.setFlags(Qt.NoItemFlags)
         self.word_completion.addItem(loading_item)
+        self.stop_prefetch()
+        cache_key = (unicode(word), self.dictionaries.generation)
+        groups = self.completion_cache.get(cache_key)
+        if groups is not None:
+            log.debug('Completions for %r found in cache', unicode(word))
+            self.word_lookup.stop()
+            self.current_lookup = None
+            self.show_word_completion(word, groups)
+            return
         self.tabs.show_loading(_('Looking up <strong>%s</strong>') % unicode(word))
 
-        if self.current_lookup_thread:
-            self.current_lookup_thread.stop()
-            self.current_lookup_thread = None
-
-        word_lookup_thread = WordLookupThread(self.dictionaries, word, self)
-        word_lookup_thread.lookup_failed.connect(self.word_lookup_failed,
-                                                 Qt.QueuedConnection)
-        word_lookup_thread.done.connect(self.word_lookup_finished,
-                                        Qt.QueuedConnection)
-        word_lookup_thread.finished.connect(
-            functools.partial(word_lookup_thread.setParent, None),
-            Qt.QueuedConnection)
-        self.current_lookup_thread = word_lookup_thread
-        word_lookup_thread.start(QThread.LowestPriority)
+        #cancels previous lookup if it is still running
+        self.current_lookup = word
+        self.current_lookup_key = cache_key
+        self.word_lookup.lookup(word)
 
     def word_lookup_failed(self, word, exception_txt):
+        if word != self.current_lookup:
+            return
+        self.current_lookup = None
         formatted_error = (_('Error while looking up %(word)s:\n'
                              '%(exception)s') %
                            dict(word=word, exception=exception_txt))
         self.show_dict_error(_('Word Lookup Failed'), formatted_error)
 
     def word_lookup_finished(self, word, entries):
+        if word != self.current_lookup:
+            #finished before it was cancelled, but is not needed anymore
+            return
         log.debug('Lookup for %r finished, got %d article(s)', word, len(entries))
-        self.word_completion.clear()
-        items = dict()
-        for entry in entries:
-            article_key =  article_grouping_key(entry)
-            if article_key in items:
-                item = items[article_key]
-                article_group = item.data(Qt.UserRole).toPyObject()
-                article_group.append(entry)
-                item.setData(Qt.UserRole, QVariant(article_group))
-            else:
-                item = QListWidgetItem()
-                item.setText(entry.title)
-                item.setData(Qt.UserRole, QVariant([entry]))
-                items[article_key] = item
-            self.word_completion.addItem(item)
+        self.current_lookup = None
+        groups = group_entries(entries)
+        if groups:
+            #nothing found shows suggestions, so lookup is repeated
+            self.completion_cache[self.current_lookup_key] = groups
+        self.show_word_completion(word, groups)
+
+    def show_word_completion(self, word, groups):
+        self.fill_word_completion(groups)
 
         count = range(self.word_completion.count())
         if count:
             item = self.word_completion.item(0)
-            self.word_completion.setCurrentItem(item)
+            #one prefetch for first rows instead of another
+            #one for the selection
+            self.prefetch_on_selection = False
+            try:
+                self.word_completion.setCurrentItem(item)
+            finally:
+                self.prefetch_on_selection = True
             self.word_completion.scrollToItem(item)
             self.tabs.show_loading('')
+            self.prefetch(range(prefetch_groups))
         else:
             self.tabs.show_nothing(self.windowState() == Qt.WindowFullScreen)
             #add to history if nothing found so that back button works
             self.add_to_history(unicode(word))
-        self.current_lookup_thread = None
+
+    def word_lookup_suggested(self, word, entries):
+        if (self.current_lookup is not None or
+            word != self.word_input.text() or
+            self.word_completion.count()):
+            #user moved on to another word
+            return
+        log.debug('Suggesting %d article(s) for %r', len(entries), word)
+        self.word_completion.blockSignals(True)
+        self.fill_word_completion(group_entries(entries))
+        self.word_completion.blockSignals(False)
+        self.tabs.show_nothing(self.windowState() == Qt.WindowFullScreen,
+                               suggested=True)
+
+    def fill_word_completion(self, groups):
+        self.word_completion.clear()
+        for group in groups:
+            item = QListWidgetItem()
+            item.setText(group[0].title)
+            #groups may be cached, item gets a copy
+            item.setData(Qt.UserRole, QVariant(list(group)))
+            self.word_completion.addItem(item)
 
     def select_next_word(self):
         count = self.word_completion.count()
@@ -1260,6 +1531,40 @@ class DictView(QMainWindow):
     def word_selection_changed(self, selected, _deselected):
         func = functools.partial(self.update_shown_article, selected)
         self.schedule(func, 200)
+        if selected and self.prefetch_on_selection:
+            row = self.word_completion.row(selected)
+            self.prefetch([row, row + 1, row - 1])
+
+    def prefetch(self, rows):
+        """
+        Load articles shown first for word completion items in rows
+        into render cache in background.
+
+        """
+        entries = []
+        for row in rows:
+            item = self.word_completion.item(row)
+            if item is None or not item.flags() & Qt.ItemIsEnabled:
+                continue
+            group = item.data(Qt.UserRole).toPyObject()
+            if group:
+                entries.append(self.sort_preferred(group)[0])
+        self.stop_prefetch()
+        if not entries:
+            return
+        prefetch_thread = ArticlePrefetchThread(self.dictionaries, entries,
+                                                self.render_cache,
+                                                parent=self)
+        prefetch_thread.finished.connect(
+            functools.partial(prefetch_thread.setParent, None),
+            Qt.QueuedConnection)
+        self.current_prefetch_thread = prefetch_thread
+        prefetch_thread.start(QThread.LowestPriority)
+
+    def stop_prefetch(self):
+        if self.current_prefetch_thread:
+            self.current_prefetch_thread.stop()
+            self.current_prefetch_thread = None
 
     def history_selection_changed(self, selected, _deselected):
         title = unicode(selected.text()) if selected else u''
@@ -1275,6 +1580,7 @@ class DictView(QMainWindow):
                                              self.history_view.count() - 1)
 
     def update_shown_article(self, selected):
+        self.stop_tabs_loading()
         self.clear_current_articles()
         if selected:
             self.add_to_history(unicode(selected.text()))
@@ -1313,10 +1619,58 @@ class DictView(QMainWindow):
                      self.word_completion.hasFocus())):
                 view_to_load.setFocus()
             self.load_article(view_to_load)
+            if self.eager_tab_loading:
+                self.load_other_tabs()
+
+    def load_other_tabs(self):
+        self.stop_tabs_loading()
+        entries = [self.tabs.widget(i).entry
+                   for i in range(1, min(self.tabs.count(),
+                                         eager_tab_limit + 1))]
+        if not entries:
+            return
+        tabs_thread = ArticlePrefetchThread(self.dictionaries, entries,
+                                            self.render_cache,
+                                            max_size=eager_tab_memory,
+                                            parent=self)
+        tabs_thread.article_ready.connect(self.tab_article_ready,
+                                          Qt.QueuedConnection)
+        tabs_thread.finished.connect(
+            functools.partial(tabs_thread.setParent, None),
+            Qt.QueuedConnection)
+        self.current_tabs_thread = tabs_thread
+        tabs_thread.start(QThread.LowPriority)
+
+    def tab_article_ready(self, entry):
+        for i in range(self.tabs.count()):
+            view = self.tabs.widget(i)
+            if (view.entry == entry and view.article is None
+                and not view.loading):
+                #article is in render cache, page is set right away
+                self.load_article(view)
+
+    def stop_tabs_loading(self):
+        if self.current_tabs_thread:
+            self.current_tabs_thread.stop()
+            self.current_tabs_thread = None
+
+    def toggle_eager_tab_loading(self, eager):
+        self.eager_tab_loading = eager
+        if eager:
+            self.load_other_tabs()
+        else:
+            self.stop_tabs_loading()
 
     def load_article(self, view):
         view.article_loaded = True
-        load_thread = ArticleLoadThread(self.dictionaries, view, self)
+        article = self.render_cache.get(view.entry)
+        if article is not None:
+            view.article = article
+            view.loading = False
+            self.article_loaded(view)
+            return
+        load_thread = ArticleLoadThread(self.dictionaries, view,
+                                        self.render_cache, self)
         load_thread.article_loaded.connect(self.article_loaded,
                                            Qt.QueuedConnection)
         load_thread.article_load_failed.connect(self.article_load_failed,
@@ -1571,6 +1925,15 @@ class DictView(QMainWindow):
         dialog.setWindowTitle(_('Verify'))
         content = QVBoxLayout()
 
+        def set_verify_status(status_item, isvalid, verified_time):
+            date = format_verification_time(verified_time)
+            if isvalid:
+                status_item.setText(_('Ok (verified on %s)') % date)
+                status_item.setData(Qt.DecorationRole, icons['emblem-ok'])
+            else:
+                status_item.setText(_('Corrupt (verified on %s)') % date)
+                status_item.setData(Qt.DecorationRole, icons['emblem-unreadable'])
+
         item_list = QTableWidget()
         item_list.setRowCount(len(self.dictionaries))
         item_list.setColumnCount(2)
@@ -1586,8 +1949,13 @@ class DictView(QMainWindow):
             item = QTableWidgetItem(text)
             item.setData(Qt.UserRole, QVariant(volume.volume_id))
             item_list.setItem(i, 1, item)
-            item = QTableWidgetItem(_('Unverified'))
-            item.setData(Qt.DecorationRole, icons['question'])
+            item = QTableWidgetItem()
+            previous = volume.verification()
+            if previous is None:
+                item.setText(_('Unverified'))
+                item.setData(Qt.DecorationRole, icons['question'])
+            else:
+                set_verify_status(item, *previous)
             item_list.setItem(i, 0, item)
 
         item_list.horizontalHeader().setStretchLastSection(True)
@@ -1595,6 +1963,10 @@ class DictView(QMainWindow):
 
         content.addWidget(item_list)
 
+        cb_force = QCheckBox(_('Verify again even if volume '
+                               'was verified before'))
+        content.addWidget(cb_force)
+
         dialog.setLayout(content)
         button_box = QDialogButtonBox()
 
@@ -1605,7 +1977,8 @@ class DictView(QMainWindow):
             item = item_list.item(current_row, 1)
             volume_id = str(item.data(Qt.UserRole).toString())
             volume = self.dictionaries.volume(volume_id)
-            verify_thread = VolumeVerifyThread(volume)
+            verify_thread = VolumeVerifyThread(volume,
+                                               force=cb_force.isChecked())
             progress = QProgressDialog(dialog)
             progress.setWindowTitle(_('Verifying...'))
             progress.setLabelText(format_title(volume))
@@ -1618,12 +1991,16 @@ class DictView(QMainWindow):
 
             def verified(isvalid):
                 status_item = item_list.item(current_row, 0)
-                if isvalid:
-                    status_item.setText(_('Ok'))
-                    status_item.setData(Qt.DecorationRole, icons['emblem-ok'])
-                else:
-                    status_item.setText(_('Corrupt'))
-                    status_item.setData(Qt.DecorationRole, icons['emblem-unreadable'])
+                previous = volume.verification()
+                verified_time = previous[1] if previous else time.time()
+                set_verify_status(status_item, isvalid, verified_time)
+                error = verify_thread.error
+                if error and error.bad_range:
+                    damaged = volume.damaged_articles(*error.bad_range)
+                    lines = [_('%d article(s) affected') % len(damaged)]
+                    lines.extend(volume.words[i] for i in damaged[:10])
+                    status_item.setToolTip(u'\n'.join(lines))
+                item_list.resizeColumnToContents(0)
 
             def finished():
                 verify_thread.volume = None
@@ -1889,6 +2266,7 @@ This is text with a footnote reference<a id="_r123" href="#">[1]</a>. <br>
                               colors=res.colors,
                               fonts=dict(default=unicode(res.font.toString())))
             state.write_appearance(appearance)
+            self.render_cache.clear()
             style = res.style()
             for i in range(self.tabs.count()):
                 view = self.tabs.widget(i)
@@ -1949,10 +2327,10 @@ This is text with a footnote reference<a id="_r123" href="#">[1]</a>. <br>
         self.toolbar.toggleViewAction().setEnabled(enabled)
 
     def closeEvent(self, _event):
+        self.word_lookup.shutdown()
         self.clear_current_articles()
         self.write_state()
-        for d in self.dictionaries:
-            d.close()
+        self.dictionaries.close()
 
     def update_title(self):
         dict_title = self.create_dict_title()
@@ -2014,6 +2392,7 @@ This is text with a footnote reference<a id="_r123" href="#">[1]</a>. <br>
         appstate['last_dir_parent'] = self.last_dir_parent
         appstate['last_save'] = self.last_save
         appstate['zoom_factor'] = self.zoom_factor
+        appstate['eager_tab_loading'] = self.eager_tab_loading
 
         scroll_values = []
         for entry, value in self.scroll_values.iteritems():
@@ -2058,6 +2437,8 @@ This is text with a footnote reference<a id="_r123" href="#">[1]</a>. <br>
         self.last_dir_parent = appstate['last_dir_parent']
         self.last_save = appstate['last_save']
         self.zoom_factor = appstate['zoom_factor']
+        self.eager_tab_loading = appstate['eager_tab_loading']
+        self.action_eager_tabs.setChecked(self.eager_tab_loading)
 
         scrollvalues = appstate['scroll_values']
         for item in scrollvalues:
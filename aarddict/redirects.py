@@ -0,0 +1,102 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Precomputed redirect resolution for a dictionary.
+
+Table has one record per index item of each volume of the dictionary:
+number of the volume with final redirect target, target index and
+section. Volume number NO_TARGET marks items that are not redirects or
+could not be resolved.
+
+"""
+
+from aarddict import sidecar
+
+KIND = 'rdir'
+
+NO_TARGET = 0xFFFF
+
+RECORD_FORMAT = '>HLL'
+
+
+def build_table(dictionary_id, volumes, resolve):
+    """
+    Write redirect table, yielding progress. `volumes` is a list of
+    (volume_id, index count) tuples, `resolve(volume_id, index)` returns
+    (volume_id, index, section) of the final redirect target or None.
+
+    """
+    volume_ids = [volume_id for volume_id, _ in volumes]
+    numbers = dict((volume_id, i) for i, volume_id in enumerate(volume_ids))
+    sections = {u'': 0}
+    total = float(sum(count for _, count in volumes) or 1)
+    done = [0]
+
+    def records(volume_id, count):
+        for index in xrange(count):
+            done[0] += 1
+            target = resolve(volume_id, index)
+            if target is None or target[0] not in numbers:
+                yield (NO_TARGET, 0, 0)
+            else:
+                target_volume_id, target_index, section = target
+                section_ref = sections.setdefault(section, len(sections))
+                yield (numbers[target_volume_id], target_index, section_ref)
+
+    writer = sidecar.SidecarWriter(dictionary_id, KIND)
+    try:
+        writer.add_strings(volume_ids)
+        for volume_id, count in volumes:
+            writer.add_records(RECORD_FORMAT, records(volume_id, count))
+            yield done[0]/total
+        ordered_sections = sorted(sections, key=sections.get)
+        writer.add_strings(section.encode('utf8')
+                           for section in ordered_sections)
+    except:
+        writer.abort()
+        raise
+    else:
+        writer.close()
+
+
+def open_table(dictionary_id):
+    table_sidecar = sidecar.open_sidecar(dictionary_id, KIND)
+    return RedirectTable(table_sidecar) if table_sidecar else None
+
+
+class RedirectTable(object):
+
+    def __init__(self, table_sidecar):
+        self.sidecar = table_sidecar
+        self.volume_ids = list(table_sidecar[0])
+        self.records = dict(zip(self.volume_ids, table_sidecar[1:-1]))
+        self.sections = table_sidecar[-1]
+
+    def get(self, volume_id, index):
+        """
+        Return (volume_id, index, section) of redirect target or None.
+
+        """
+        records = self.records.get(volume_id)
+        if records is None or not 0 <= index < len(records):
+            return None
+        number, target_index, section_ref = records[index]
+        if number == NO_TARGET:
+            return None
+        return (self.volume_ids[number], target_index,
+                self.sections[section_ref].decode('utf8'))
+
+    def close(self):
+        self.sidecar.close()
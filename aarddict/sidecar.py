@@ -0,0 +1,245 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Auxiliary index files built for dictionary volumes.
+
+A sidecar file is keyed by volume (or dictionary) id and consists of a
+sequence of tables. String tables hold variable length byte strings
+addressed through a fixed-stride offset array, record tables hold fixed
+size structs. Both are read straight from a memory map.
+
+"""
+
+from __future__ import with_statement
+import logging
+import os
+import mmap
+
+from struct import calcsize, pack, unpack
+
+log = logging.getLogger(__name__)
+
+sidecar_dir = os.path.join(os.path.expanduser('~'), '.aarddict', 'index')
+
+MAGIC = 'aidx'
+VERSION = 1
+
+HEADER_FORMAT = '>4sH4s40s16sQ' # magic, version, kind, owner id, tag, directory offset
+DIR_COUNT_FORMAT = '>L'
+DIR_ITEM_FORMAT = '>8sQQQ' # item format, count, data offset, offsets offset
+
+STRINGS = 's'
+
+
+class SidecarError(Exception): pass
+
+
+def sidecar_path(owner_id, kind):
+    return os.path.join(sidecar_dir, '%s.%s' % (owner_id, kind))
+
+
+class StringTable(object):
+    """
+    Sequence of byte strings stored in a memory map. Offsets are
+    unsigned integers of `offset_format`, one more than there are
+    strings.
+
+    """
+
+    def __init__(self, fmap, data_offset, offsets_offset, count,
+                 offset_format):
+        self.fmap = fmap
+        self.data_offset = data_offset
+        self.offsets_offset = offsets_offset
+        self.count = count
+        self.pair_format = '>2' + offset_format
+        self.offset_size = calcsize('>' + offset_format)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if 0 <= i < self.count:
+            pos = self.offsets_offset + i*self.offset_size
+            start, end = unpack(self.pair_format,
+                                self.fmap[pos:pos+2*self.offset_size])
+            return self.fmap[self.data_offset+start:self.data_offset+end]
+        else:
+            raise IndexError
+
+
+class RecordTable(object):
+    """
+    Sequence of fixed size struct records stored in a memory map.
+
+    """
+
+    def __init__(self, fmap, data_offset, count, record_format):
+        self.fmap = fmap
+        self.data_offset = data_offset
+        self.count = count
+        self.record_format = record_format
+        self.record_size = calcsize(record_format)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if 0 <= i < self.count:
+            pos = self.data_offset + i*self.record_size
+            return unpack(self.record_format,
+                          self.fmap[pos:pos+self.record_size])
+        else:
+            raise IndexError
+
+
+class Sidecar(object):
+
+    def __init__(self, file_name, kind, owner_id, tag=''):
+        self.file_name = file_name
+        self.tables = []
+        with open(file_name, 'rb') as f:
+            self.fmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_tables(kind, owner_id, tag)
+        except:
+            self.fmap.close()
+            raise
+
+    def _read_tables(self, kind, owner_id, tag):
+        header_size = calcsize(HEADER_FORMAT)
+        if len(self.fmap) < header_size:
+            raise SidecarError('%s: truncated file' % self.file_name)
+        (magic, version, file_kind, file_owner_id,
+         file_tag, dir_offset) = unpack(HEADER_FORMAT,
+                                        self.fmap[:header_size])
+        if magic != MAGIC or version != VERSION:
+            raise SidecarError('%s: unsupported format' % self.file_name)
+        if (file_kind != kind or
+            file_owner_id.rstrip('\0') != owner_id or
+            file_tag.rstrip('\0') != tag):
+            raise SidecarError('%s: built for different data' % self.file_name)
+        count_size = calcsize(DIR_COUNT_FORMAT)
+        count, = unpack(DIR_COUNT_FORMAT,
+                        self.fmap[dir_offset:dir_offset+count_size])
+        item_size = calcsize(DIR_ITEM_FORMAT)
+        pos = dir_offset + count_size
+        for _ in range(count):
+            fmt, n, data_offset, offsets_offset = unpack(
+                DIR_ITEM_FORMAT, self.fmap[pos:pos+item_size])
+            fmt = fmt.rstrip('\0')
+            if fmt.startswith(STRINGS):
+                table = StringTable(self.fmap, data_offset, offsets_offset,
+                                    n, fmt[len(STRINGS):])
+            else:
+                table = RecordTable(self.fmap, data_offset, n, fmt)
+            self.tables.append(table)
+            pos += item_size
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __getitem__(self, i):
+        return self.tables[i]
+
+    def close(self):
+        self.tables = []
+        self.fmap.close()
+
+
+def open_sidecar(owner_id, kind, tag=''):
+    """
+    Open sidecar of the given kind for owner, return None if it
+    doesn't exist or was built for different data.
+
+    """
+    file_name = sidecar_path(owner_id, kind)
+    if not os.path.exists(file_name):
+        return None
+    try:
+        return Sidecar(file_name, kind, owner_id, tag)
+    except (SidecarError, EnvironmentError, mmap.error, ValueError), e:
+        #mmap raises ValueError for empty file
+        log.info('Ignoring sidecar %s: %s', file_name, e)
+        return None
+
+
+class SidecarWriter(object):
+    """
+    Writes tables one after another to a temporary file which replaces
+    sidecar file on `close()`.
+
+    """
+
+    def __init__(self, owner_id, kind, tag=''):
+        if not os.path.exists(sidecar_dir):
+            os.makedirs(sidecar_dir)
+        self.file_name = sidecar_path(owner_id, kind)
+        self.tmp_file_name = self.file_name + '.tmp'
+        self.kind = kind
+        self.owner_id = owner_id
+        self.tag = tag
+        self.directory = []
+        self.f = open(self.tmp_file_name, 'wb')
+        self._write_header(0)
+
+    def _write_header(self, dir_offset):
+        self.f.seek(0)
+        self.f.write(pack(HEADER_FORMAT, MAGIC, VERSION, self.kind,
+                          self.owner_id, self.tag, dir_offset))
+
+    def add_strings(self, strings):
+        f = self.f
+        data_offset = f.tell()
+        offsets = [0]
+        end = 0
+        for s in strings:
+            f.write(s)
+            end += len(s)
+            offsets.append(end)
+        offset_format = 'L' if end < 2**32 else 'Q'
+        offsets_offset = f.tell()
+        fmt = '>' + offset_format
+        for offset in offsets:
+            f.write(pack(fmt, offset))
+        self.directory.append((STRINGS + offset_format, len(offsets) - 1,
+                               data_offset, offsets_offset))
+
+    def add_records(self, record_format, records):
+        f = self.f
+        data_offset = f.tell()
+        count = 0
+        for record in records:
+            f.write(pack(record_format, *record))
+            count += 1
+        self.directory.append((record_format, count, data_offset, 0))
+
+    def close(self):
+        f = self.f
+        f.seek(0, os.SEEK_END)
+        dir_offset = f.tell()
+        f.write(pack(DIR_COUNT_FORMAT, len(self.directory)))
+        for item in self.directory:
+            f.write(pack(DIR_ITEM_FORMAT, *item))
+        self._write_header(dir_offset)
+        f.close()
+        if os.path.exists(self.file_name):
+            os.remove(self.file_name)
+        os.rename(self.tmp_file_name, self.file_name)
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp_file_name):
+            os.remove(self.tmp_file_name)
@@ -86,6 +86,7 @@ def read_state(load=True):
                  last_save=home,
                  geometry=geometry,
                  zoom_factor=1.0,
+                 eager_tab_loading=False,
                  history=[],
                  history_current=-1,
                  scroll_values={})
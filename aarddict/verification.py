@@ -0,0 +1,83 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Results of volume verification.
+
+Results are kept in a json file in application directory, keyed by
+absolute file name. A result is only used while file size, modification
+time, inode and sha1sum from volume header are the same as when file
+was verified.
+
+"""
+
+from __future__ import with_statement
+import os
+import time
+import logging
+
+from threading import Lock
+
+from aarddict import jsonstore
+
+log = logging.getLogger(__name__)
+
+verified_file = os.path.expanduser('~/.aarddict/verified.json')
+
+_lock = Lock()
+
+
+def file_identity(file_name, sha1sum):
+    st = os.stat(file_name)
+    return dict(size=st.st_size, mtime=st.st_mtime, inode=st.st_ino,
+                sha1sum=sha1sum)
+
+
+def get(file_name, sha1sum):
+    """
+    Return (valid, verification time) for file if it was verified and
+    hasn't changed since, None otherwise.
+
+    """
+    try:
+        identity = file_identity(file_name, sha1sum)
+    except EnvironmentError:
+        return None
+    with _lock:
+        results = jsonstore.load(verified_file)
+    record = results.get(jsonstore.file_key(file_name))
+    if not record or record.get('identity') != identity:
+        return None
+    return record['valid'], record['time']
+
+
+def put(file_name, sha1sum, valid):
+    try:
+        identity = file_identity(file_name, sha1sum)
+    except EnvironmentError:
+        log.warning('Could not record verification result for %s',
+                    file_name, exc_info=1)
+        return
+    record = dict(identity=identity, valid=valid, time=time.time())
+    with _lock:
+        results = jsonstore.load(verified_file)
+        results[jsonstore.file_key(file_name)] = record
+        try:
+            jsonstore.save(verified_file, results, indent=2)
+        except EnvironmentError:
+            log.warning('Could not write %s', verified_file, exc_info=1)
+
+
+def format_time(t):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(t))
@@ -0,0 +1,169 @@
+# This file is part of Aard Dictionary <http://aarddict.org>.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License <http://www.gnu.org/licenses/gpl-3.0.txt>
+# for more details.
+#
+# Copyright (C) 2010 Igor Tkach
+
+"""
+Wildcard title patterns: `*` matches any number of characters, `?`
+matches one character. Matching ignores case and accents.
+
+Literal prefix of a pattern narrows search to a range of volume
+index. Patterns starting with a wildcard use reversed title index,
+where normalized titles are stored reversed and sorted, so literal
+suffix of a pattern narrows search to a range of it.
+
+"""
+
+import re
+
+from bisect import bisect_left
+
+from aarddict import sidecar
+from aarddict.fuzzy import normalize
+
+KIND = 'rttl'
+
+WILDCARDS = u'*?'
+
+#number of index items matched between yielding results
+batch_size = 2000
+
+
+def is_pattern(word):
+    """
+    >>> is_pattern(u'colo?r'), is_pattern(u'colour')
+    (True, False)
+
+    """
+    return any(c in word for c in WILDCARDS)
+
+
+def literal_prefix(pattern):
+    """
+    >>> literal_prefix(u'colo?r')
+    u'colo'
+    >>> literal_prefix(u'*ology')
+    u''
+
+    """
+    for i, c in enumerate(pattern):
+        if c in WILDCARDS:
+            return pattern[:i]
+    return pattern
+
+
+def literal_suffix(pattern):
+    """
+    >>> literal_suffix(u'*ology')
+    u'ology'
+    >>> literal_suffix(u'colo?r')
+    u'r'
+    >>> literal_suffix(u'colo*')
+    u''
+
+    """
+    for i in xrange(len(pattern) - 1, -1, -1):
+        if pattern[i] in WILDCARDS:
+            return pattern[i+1:]
+    return pattern
+
+
+def compile_pattern(pattern):
+    """
+    Return function testing if word matches pattern.
+
+    >>> match = compile_pattern(u'colo?r')
+    >>> match(u'Colour'), match(u'color'), match(u'colouring')
+    (True, False, False)
+    >>> compile_pattern(u'*ology')(u'Biolog\\xeda')
+    False
+    >>> compile_pattern(u'*olog?a')(u'Biolog\\xeda')
+    True
+
+    """
+    parts = []
+    for c in normalize(pattern):
+        if c == u'*':
+            parts.append(u'.*')
+        elif c == u'?':
+            parts.append(u'.')
+        else:
+            parts.append(re.escape(c))
+    regex = re.compile(u''.join(parts) + u'\\Z', re.UNICODE | re.DOTALL)
+    def match(word):
+        return regex.match(normalize(word)) is not None
+    return match
+
+
+def reversed_key(word):
+    """
+    >>> reversed_key(u'Caf\\xe9')
+    'efac'
+
+    """
+    return normalize(word)[::-1].encode('utf8')
+
+
+def build_index(owner_id, words, count):
+    """
+    Write reversed title index for `words` (an iterable of `count`
+    unicode strings), yielding progress.
+
+    """
+    keys = []
+    for i, word in enumerate(words):
+        keys.append((reversed_key(word), i))
+        if i % 10000 == 0:
+            yield 0.8*i/(count or 1)
+    keys.sort()
+    yield 0.9
+    writer = sidecar.SidecarWriter(owner_id, KIND)
+    try:
+        writer.add_strings(key for key, _ in keys)
+        writer.add_records('>L', ((i,) for _, i in keys))
+    except:
+        writer.abort()
+        raise
+    else:
+        writer.close()
+    yield 1.0
+
+
+def open_index(owner_id):
+    index_sidecar = sidecar.open_sidecar(owner_id, KIND)
+    return ReversedIndex(index_sidecar) if index_sidecar else None
+
+
+class ReversedIndex(object):
+
+    def __init__(self, index_sidecar):
+        self.sidecar = index_sidecar
+        self.keys = index_sidecar[0]
+        self.positions = index_sidecar[1]
+
+    def index(self, i):
+        """Volume index number of i-th reversed key"""
+        return self.positions[i][0]
+
+    def suffix_range(self, suffix):
+        """
+        Return (lo, hi) range of reversed keys for words ending
+        with `suffix`.
+
+        """
+        key = reversed_key(suffix)
+        #utf-8 never contains 0xff byte
+        return (bisect_left(self.keys, key),
+                bisect_left(self.keys, key + '\xff'))
+
+    def close(self):
+        self.sidecar.close()
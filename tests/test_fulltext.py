@@ -0,0 +1,41 @@
+import tempfile
+import shutil
+
+from aarddict import sidecar, fulltext
+
+def setup():
+    global orig_sidecar_dir
+    orig_sidecar_dir = sidecar.sidecar_dir
+    sidecar.sidecar_dir = tempfile.mkdtemp()
+
+def teardown():
+    shutil.rmtree(sidecar.sidecar_dir)
+    sidecar.sidecar_dir = orig_sidecar_dir
+
+
+class TextVolume(object):
+
+    volume_id = 'f'*40
+    file_name = 'texts.aar'
+
+    def __init__(self, texts):
+        self.texts = texts
+
+    def __len__(self):
+        return len(self.texts)
+
+    def read_content(self, index):
+        return self.texts[index], None
+
+
+def test_index_ascii_text_without_tags():
+    #json decoders return such text as str, not unicode
+    volume = TextVolume(['text ab 0', u'<b>caf\xe9</b> text'])
+    list(fulltext.build_index(volume, processes=1))
+    index = fulltext.open_index(volume.volume_id)
+    try:
+        assert [i for _, _, i in index.search(u'ab')] == [0]
+        assert sorted(i for _, _, i in index.search(u'text')) == [0, 1]
+        assert [i for _, _, i in index.search(u'cafe')] == [1]
+    finally:
+        index.close()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from aarddict.dictionary import (Volume, Library, collation_key,
+                                 PRIMARY, TERTIARY)
+
+
+class WordsVolume(Volume):
+    """Volume with index made of given words, sorted as by compiler"""
+
+    def __init__(self, words):
+        self.volume_id = 'words'
+        self.words = sorted(words, key=lambda word:
+                            collation_key(word, TERTIARY).getByteArray())
+
+    def sort_key_list(self, strength):
+        return [collation_key(word, strength).getByteArray()
+                for word in self.words]
+
+    def close(self):
+        pass
+
+
+words = [u'ab', u'abc', u'Abc', u'abd', u'Abd', u'abe', u'b',
+         u'cote', u'côte', u'coté', u'côté', u'cotes']
+
+def titles(library, word):
+    return [entry.title for entry in library.best_match(word)]
+
+def check_typing(*typed):
+    vol = WordsVolume(words)
+    library = Library([vol], lookup_workers=0)
+    for word in typed:
+        fresh = Library([vol], lookup_workers=0)
+        assert titles(library, word) == titles(fresh, word), word
+
+def test_narrowed_same_as_fresh():
+    yield check_typing, u'a', u'ab', u'abd'
+    yield check_typing, u'A', u'Ab', u'Abd'
+    yield check_typing, u'c', u'co', u'cot', u'coté', u'côté'
+    yield check_typing, u'abd', u'ab', u'b', u'abe'
+
+def test_tertiary_match_found_after_narrowing():
+    vol = WordsVolume(words)
+    library = Library([vol], lookup_workers=0)
+    titles(library, u'ab')
+    assert titles(library, u'abd')[0] == u'abd'
+    assert len(vol.lookup_range(u'ab', PRIMARY)) == 6
@@ -0,0 +1,37 @@
+import tempfile
+import shutil
+
+from aarddict import sidecar
+
+def setup():
+    global orig_sidecar_dir
+    orig_sidecar_dir = sidecar.sidecar_dir
+    sidecar.sidecar_dir = tempfile.mkdtemp()
+
+def teardown():
+    shutil.rmtree(sidecar.sidecar_dir)
+    sidecar.sidecar_dir = orig_sidecar_dir
+
+def test_write_read_tables():
+    w = sidecar.SidecarWriter('a'*40, 'test', 'tag')
+    w.add_strings(['abc', '', 'de'])
+    w.add_records('>HL', [(1, 2), (3, 4)])
+    w.close()
+    s = sidecar.open_sidecar('a'*40, 'test', 'tag')
+    assert len(s) == 2
+    assert list(s[0]) == ['abc', '', 'de'], list(s[0])
+    assert list(s[1]) == [(1, 2), (3, 4)], list(s[1])
+    s.close()
+
+def test_tag_mismatch():
+    w = sidecar.SidecarWriter('b'*40, 'test', 'tag1')
+    w.add_strings(['a'])
+    w.close()
+    assert sidecar.open_sidecar('b'*40, 'test', 'tag2') is None
+
+def test_missing():
+    assert sidecar.open_sidecar('c'*40, 'test') is None
+
+def test_empty_file():
+    open(sidecar.sidecar_path('d'*40, 'test'), 'wb').close()
+    assert sidecar.open_sidecar('d'*40, 'test') is None
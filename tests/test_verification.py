@@ -0,0 +1,29 @@
+from __future__ import with_statement
+import os
+import tempfile
+import shutil
+
+from aarddict import verification
+
+def setup():
+    global orig_verified_file, tmp_dir
+    orig_verified_file = verification.verified_file
+    tmp_dir = tempfile.mkdtemp()
+    verification.verified_file = os.path.join(tmp_dir, 'verified.json')
+
+def teardown():
+    shutil.rmtree(tmp_dir)
+    verification.verified_file = orig_verified_file
+
+def test_result_reused_while_unchanged():
+    file_name = os.path.join(tmp_dir, 'vol.aar')
+    with open(file_name, 'wb') as f:
+        f.write('abc')
+    assert verification.get(file_name, 'x') is None
+    verification.put(file_name, 'x', True)
+    valid, _ = verification.get(file_name, 'x')
+    assert valid
+    assert verification.get(file_name, 'y') is None
+    with open(file_name, 'ab') as f:
+        f.write('d')
+    assert verification.get(file_name, 'x') is None